@@ -0,0 +1,3 @@
+# Offline benchmarks: synthetic library, fake Telegram updates and a stub OBS.
+# Usage: python -m bench run --files 100000 --output before.json
+#        python -m bench compare before.json after.json
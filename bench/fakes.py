@@ -0,0 +1,89 @@
+import itertools
+from collections import Counter
+from datetime import datetime, timezone
+
+from telegram import Bot, Update, Message, Chat, User, CallbackQuery, InlineQuery
+
+# Real telegram objects bound to a Bot that never touches the network, so the
+# handlers run their normal code paths (isinstance(..., Update), reply_text,
+# edit_message_text, query.answer) without a token.
+
+_ids = itertools.count(1)
+
+
+class FakeBot(Bot):
+    def __init__(self):
+        super().__init__("123456:bench-token")
+        object.__setattr__(self, "calls", Counter())
+        object.__setattr__(self, "last_text", None)
+        object.__setattr__(self, "last_markup", None)
+        object.__setattr__(self, "replies", {})    # chat id -> last text, for concurrent users
+
+    def _record(self, name, kwargs):
+        self.calls[name] += 1
+        object.__setattr__(self, "last_text", kwargs.get("text"))
+        object.__setattr__(self, "last_markup", kwargs.get("reply_markup"))
+        if kwargs.get("chat_id") is not None:
+            self.replies[kwargs["chat_id"]] = kwargs.get("text")
+        return True
+
+    async def send_message(self, *args, **kwargs):
+        return self._record("send_message", kwargs)
+
+    async def edit_message_text(self, *args, **kwargs):
+        return self._record("edit_message_text", kwargs)
+
+    async def answer_callback_query(self, *args, **kwargs):
+        return self._record("answer_callback_query", kwargs)
+
+    async def send_chat_action(self, *args, **kwargs):
+        return self._record("send_chat_action", kwargs)
+
+    async def answer_inline_query(self, *args, **kwargs):
+        return self._record("answer_inline_query", kwargs)
+
+
+class FakeContext:
+    def __init__(self, bot, user_data=None, args=None, bot_data=None):
+        self.bot = bot
+        self.user_data = {} if user_data is None else user_data
+        self.chat_data = {}
+        self.bot_data = {} if bot_data is None else bot_data
+        self.args = args or []
+
+
+def make_user(user_id):
+    return User(id=user_id, first_name=f"user{user_id}", is_bot=False, username=f"user{user_id}")
+
+
+def _message(bot, user, text=None):
+    chat = Chat(id=user.id, type=Chat.PRIVATE)
+    message = Message(message_id=next(_ids), date=datetime.now(timezone.utc), chat=chat,
+                      from_user=user, text=text)
+    message.set_bot(bot)
+    return message
+
+
+def command_update(bot, user_id, text):
+    user = make_user(user_id)
+    update = Update(update_id=next(_ids), message=_message(bot, user, text))
+    update.set_bot(bot)
+    return update
+
+
+def callback_update(bot, user_id, data):
+    user = make_user(user_id)
+    query = CallbackQuery(id=str(next(_ids)), from_user=user, chat_instance="bench",
+                          data=data, message=_message(bot, user))
+    query.set_bot(bot)
+    update = Update(update_id=next(_ids), callback_query=query)
+    update.set_bot(bot)
+    return update
+
+
+def inline_update(bot, user_id, text, offset=""):
+    query = InlineQuery(id=str(next(_ids)), from_user=make_user(user_id), query=text, offset=offset)
+    query.set_bot(bot)
+    update = Update(update_id=next(_ids), inline_query=query)
+    update.set_bot(bot)
+    return update
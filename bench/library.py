@@ -0,0 +1,35 @@
+import os
+import random
+import time
+
+# Synthetic video library: empty .mp4/.mkv files spread over a few top-level
+# folders with realistic-looking names and scattered mtimes.
+
+WORDS = ["Neetho", "Unte", "Chalu", "Prema", "Manasa", "Vennela", "Raja", "Rani", "Nuvvu", "Nenu",
+         "Gundello", "Kalalo", "Chinnadana", "Vasantham", "Sakhi", "Priya", "Hrudayam", "Kanulu",
+         "Naa", "Jeevitham", "Dance", "Mass", "Comedy", "Scene", "Title", "Song", "Theme", "Remix"]
+QUALITIES = ["720p", "1080p", "4K", "480p"]
+
+
+def make_library(root, count=100000, folders=4, nested=0, seed=42):
+    rng = random.Random(seed)
+    now = time.time()
+    roots = []
+    for i in range(folders):
+        folder = os.path.join(root, f"Drive{i}", f"Songs {i + 1}")
+        os.makedirs(folder, exist_ok=True)
+        roots.append(folder)
+    for n in range(count):
+        folder = roots[n % folders]
+        if nested and n % 3 == 0:
+            folder = os.path.join(folder, f"Album {n % nested}")
+            os.makedirs(folder, exist_ok=True)
+        title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+        ext = ".mp4" if rng.random() < 0.6 else ".mkv"
+        name = f"{title} ({1990 + rng.randint(0, 35)}) Telugu VideoSong - {rng.choice(QUALITIES)} - {n}{ext}"
+        path = os.path.join(folder, name)
+        with open(path, "wb"):
+            pass
+        mtime = now - rng.randint(0, 5 * 365 * 86400)
+        os.utime(path, (mtime, mtime))
+    return roots
@@ -0,0 +1,128 @@
+import os
+import sys
+import json
+import shutil
+import struct
+import tempfile
+
+from obsbot.media import probe_file, facet_tokens
+
+# Hand-built container headers for the MP4 and MKV parsers in obsbot.media.
+# They carry only the boxes/elements the parsers read, so each sample is a few
+# hundred bytes (the SeekHead one pads past HEAD_BYTES on purpose).
+# `python -m bench media` writes them to a temp folder, probes them and checks
+# the result, so a parser change can be verified without real videos.
+
+
+# === MP4 ===
+def box(kind, payload):
+    return struct.pack(">I4s", 8 + len(payload), kind) + payload
+
+
+def full_box_header(version):
+    return bytes([version, 0, 0, 0])
+
+
+def mp4_language(code):
+    # ISO-639-2 packed as three 5-bit letters.
+    value = 0
+    for char in code:
+        value = value << 5 | (ord(char) - 0x60)
+    return struct.pack(">H", value)
+
+
+def mp4_track(handler, fourcc, width=0, height=0, language="und", version=0):
+    dates = b"\0" * (32 if version else 20)
+    tkhd = full_box_header(version) + dates + b"\0" * 52 + struct.pack(">II", width << 16, height << 16)
+    mdhd = full_box_header(0) + b"\0" * 16 + mp4_language(language) + b"\0\0"
+    hdlr = full_box_header(0) + b"\0" * 4 + handler + b"\0" * 12
+    stsd = full_box_header(0) + struct.pack(">I", 1) + box(fourcc, b"\0" * 20)
+    stbl = box(b"stbl", box(b"stsd", stsd))
+    mdia = box(b"mdhd", mdhd) + box(b"hdlr", hdlr) + box(b"minf", stbl)
+    return box(b"trak", box(b"tkhd", tkhd) + box(b"mdia", mdia))
+
+
+def mp4_sample(moov_first):
+    # 90 min HEVC 1920x800 with Telugu AAC and English AC-3; moov either
+    # before the media data (faststart) or after it.
+    mvhd = full_box_header(0) + b"\0" * 8 + struct.pack(">II", 1000, 5400000) + b"\0" * 80
+    moov = box(b"moov", box(b"mvhd", mvhd) + mp4_track(b"vide", b"hvc1", 1920, 800, version=1)
+               + mp4_track(b"soun", b"mp4a", language="tel") + mp4_track(b"soun", b"ac-3", language="eng"))
+    ftyp = box(b"ftyp", b"isom\0\0\0\0")
+    if moov_first:
+        return ftyp + moov + box(b"mdat", b"x" * 50)
+    return ftyp + box(b"mdat", b"x" * 5000) + moov
+
+
+# === MKV ===
+def ebml_element(element_id, payload):
+    # Sizes are always written as 8-byte vints, which the parser must accept.
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + bytes([0x01]) + len(payload).to_bytes(7, "big") + payload
+
+
+def ebml_uint(element_id, value, length=2):
+    return ebml_element(element_id, value.to_bytes(length, "big"))
+
+
+MKV_TRACKS = ebml_element(0x1654AE6B,
+    ebml_element(0xAE, ebml_uint(0x83, 1, 1) + ebml_element(0x86, b"V_MPEG4/ISO/AVC")
+                 + ebml_element(0xE0, ebml_uint(0xB0, 1280) + ebml_uint(0xBA, 720)))
+    # Language "hin" but LanguageBCP47 "te": the BCP-47 tag wins.
+    + ebml_element(0xAE, ebml_uint(0x83, 2, 1) + ebml_element(0x86, b"A_AAC/MPEG4/LC")
+                   + ebml_element(0x22B59C, b"hin") + ebml_element(0x22B59D, b"te"))
+    # No language at all: Matroska's default is English.
+    + ebml_element(0xAE, ebml_uint(0x83, 2, 1) + ebml_element(0x86, b"A_OPUS")))
+EBML_HEADER = ebml_element(0x1A45DFA3, ebml_element(0x4282, b"matroska"))
+
+
+def mkv_sample():
+    # 2 h H.264 720p; Info and Tracks right at the start of the Segment.
+    info = ebml_element(0x1549A966, ebml_uint(0x2AD7B1, 1000000, 3) + ebml_element(0x4489, struct.pack(">d", 7200000.0)))
+    return EBML_HEADER + ebml_element(0x18538067, info + MKV_TRACKS + ebml_element(0x1F43B675, b"\0" * 100))
+
+
+def mkv_seekhead_sample():
+    # Tracks placed past HEAD_BYTES behind a Void element, found only through
+    # the SeekHead; no Info, so no duration.
+    pad = ebml_element(0xEC, b"\0" * 1100000)
+
+    def seekhead(offset):
+        seek = ebml_element(0x53AB, (0x1654AE6B).to_bytes(4, "big")) + ebml_element(0x53AC, offset.to_bytes(4, "big"))
+        return ebml_element(0x114D9B74, ebml_element(0x4DBB, seek))
+
+    offset = len(seekhead(0) + pad)
+    return EBML_HEADER + ebml_element(0x18538067, seekhead(offset) + pad + MKV_TRACKS)
+
+
+MKV_AUDIO = {"acodecs": ["aac", "opus"], "langs": ["tel", "eng"]}
+SAMPLES = {
+    "moov-last.mp4": (lambda: mp4_sample(False),
+                      {"width": 1920, "height": 800, "vcodec": "hevc", "acodecs": ["aac", "ac3"],
+                       "langs": ["tel", "eng"], "seconds": 5400.0}),
+    "moov-first.mp4": (lambda: mp4_sample(True),
+                       {"width": 1920, "height": 800, "vcodec": "hevc", "acodecs": ["aac", "ac3"],
+                        "langs": ["tel", "eng"], "seconds": 5400.0}),
+    "plain.mkv": (mkv_sample, dict(MKV_AUDIO, width=1280, height=720, vcodec="h264", seconds=7200.0)),
+    "seekhead.mkv": (mkv_seekhead_sample, dict(MKV_AUDIO, width=1280, height=720, vcodec="h264", seconds=0.0)),
+    "empty.mp4": (lambda: b"", {}),
+}
+
+
+def run_media_check(args):
+    workdir = tempfile.mkdtemp(prefix="obsbot-media-")
+    failures = {}
+    try:
+        for name, (build, expected) in SAMPLES.items():
+            path = os.path.join(workdir, name)
+            with open(path, "wb") as f:
+                f.write(build())
+            info = probe_file(path)
+            print(f"{name}: {json.dumps(info)} {sorted(facet_tokens(info))}")
+            if info != expected:
+                failures[name] = expected
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    for name, expected in failures.items():
+        print(f"{name} should parse as {json.dumps(expected)}", file=sys.stderr)
+    return 1 if failures else 0
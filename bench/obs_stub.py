@@ -0,0 +1,155 @@
+import json
+import base64
+import struct
+import hashlib
+import threading
+import socketserver
+from collections import Counter
+
+# Minimal obs-websocket v5 server: enough of the protocol for obsws_python's
+# ReqClient (Hello/Identify/Request) and the handful of requests the bot makes.
+# Authentication is not advertised, so any password is accepted.
+
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+
+def _recv_exact(rfile, n):
+    data = rfile.read(n)
+    if len(data) < n:
+        raise ConnectionError("client closed")
+    return data
+
+
+def read_frame(rfile):
+    head = _recv_exact(rfile, 2)
+    opcode = head[0] & 0x0F
+    masked = head[1] & 0x80
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", _recv_exact(rfile, 2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", _recv_exact(rfile, 8))[0]
+    mask = _recv_exact(rfile, 4) if masked else b""
+    payload = _recv_exact(rfile, length)
+    if masked:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+def write_frame(wfile, payload, opcode=0x1):
+    head = bytes([0x80 | opcode])
+    n = len(payload)
+    if n < 126:
+        head += bytes([n])
+    elif n < 65536:
+        head += bytes([126]) + struct.pack("!H", n)
+    else:
+        head += bytes([127]) + struct.pack("!Q", n)
+    wfile.write(head + payload)
+    wfile.flush()
+
+
+class ObsStubHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        stub = self.server.stub
+        headers = {}
+        self.rfile.readline()
+        while True:
+            line = self.rfile.readline().decode("latin-1").strip()
+            if not line:
+                break
+            key, _, value = line.partition(":")
+            headers[key.strip().lower()] = value.strip()
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WS_GUID).encode()).digest()).decode()
+        self.wfile.write((
+            "HTTP/1.1 101 Switching Protocols\r\n"
+            "Upgrade: websocket\r\nConnection: Upgrade\r\n"
+            f"Sec-WebSocket-Accept: {accept}\r\n\r\n"
+        ).encode())
+        self.send_json({"op": 0, "d": {"obsWebSocketVersion": "5.0.0-stub", "rpcVersion": 1}})
+        stub.connections += 1
+        try:
+            while True:
+                opcode, payload = read_frame(self.rfile)
+                if opcode == 0x8:
+                    write_frame(self.wfile, b"", 0x8)
+                    return
+                if opcode == 0x9:
+                    write_frame(self.wfile, payload, 0xA)
+                    continue
+                message = json.loads(payload)
+                if message["op"] == 1:
+                    self.send_json({"op": 2, "d": {"negotiatedRpcVersion": 1}})
+                elif message["op"] == 6:
+                    d = message["d"]
+                    data = stub.dispatch(d["requestType"], d.get("requestData") or {})
+                    response = {"requestType": d["requestType"], "requestId": d["requestId"],
+                                "requestStatus": {"result": True, "code": 100}}
+                    if data is not None:
+                        response["responseData"] = data
+                    self.send_json({"op": 7, "d": response})
+        except (ConnectionError, OSError):
+            return
+
+    def send_json(self, obj):
+        write_frame(self.wfile, json.dumps(obj).encode("utf-8"))
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class ObsStub:
+    def __init__(self, host="127.0.0.1", port=0, scene="filler"):
+        self.scene = scene
+        self.lock_scene = False     # ignore SetCurrentProgramScene (keeps handlers unblocked)
+        self.inputs = {}
+        self.requests = Counter()
+        self.connections = 0
+        self.committed = threading.Event()
+        self._server = _Server((host, port), ObsStubHandler)
+        self._server.stub = self
+        self.port = self._server.server_address[1]
+
+    def dispatch(self, request_type, data):
+        self.requests[request_type] += 1
+        if request_type == "GetVersion":
+            return {"obsVersion": "30.0.0", "obsWebSocketVersion": "5.0.0-stub", "rpcVersion": 1,
+                    "availableRequests": [], "supportedImageFormats": [], "platform": "stub",
+                    "platformDescription": "stub"}
+        if request_type == "GetCurrentProgramScene":
+            return {"currentProgramSceneName": self.scene, "sceneName": self.scene,
+                    "currentProgramSceneUuid": self.scene, "sceneUuid": self.scene}
+        if request_type == "SetCurrentProgramScene":
+            if not self.lock_scene:
+                self.scene = data.get("sceneName", self.scene)
+            return None
+        if request_type == "SetInputSettings":
+            self.inputs[data["inputName"]] = data["inputSettings"]
+            self.committed.set()
+            return None
+        return None
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+    parser = argparse.ArgumentParser(description="Run a local obs-websocket stub")
+    parser.add_argument("--port", type=int, default=4456)
+    args = parser.parse_args()
+    stub = ObsStub(port=args.port).start()
+    print(f"OBS stub listening on 127.0.0.1:{stub.port} (scene '{stub.scene}')")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stub.stop()
@@ -0,0 +1,573 @@
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import tracemalloc
+from collections import Counter
+from dataclasses import replace
+
+from bench.fakes import FakeBot, FakeContext, command_update, callback_update, inline_update
+from bench.library import make_library, WORDS
+from bench.obs_stub import ObsStub
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MOVIE_SECONDS = 600
+BREAK_SECONDS = 60
+RETRY_SECONDS = 30
+BREAK_RETURN_SECONDS = 3
+TRAFFIC_SCALE = 150         # virtual seconds per real second in the traffic run
+REJECTED = ("🚫", "⏳", "⚠️", "❌")
+
+
+# === STATS ===
+def summarize(samples, wall):
+    samples = sorted(samples)
+    n = len(samples)
+
+    def pct(q):
+        return round(samples[min(n - 1, int(q * n))] * 1000, 3) if n else 0.0
+
+    return {
+        "ops": n,
+        "throughput_per_s": round(n / wall, 1) if wall else 0.0,
+        "p50_ms": pct(0.50),
+        "p90_ms": pct(0.90),
+        "p99_ms": pct(0.99),
+        "max_ms": round(samples[-1] * 1000, 3) if n else 0.0,
+    }
+
+
+async def measure(calls):
+    samples = []
+    wall_start = time.perf_counter()
+    for call in calls:
+        start = time.perf_counter()
+        await call()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples, time.perf_counter() - wall_start)
+
+
+def peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+# === TARGET ===
+def write_config(workdir, roots, obs_port, features, state="memory"):
+    config = {
+        "BOT_TOKEN": "123456:bench-token",
+        "VIDEO_FOLDER": roots,
+        "NOTEPAD_FILE": "playitems.txt",
+        "TIME_LIMIT": 60,
+        "SCENE_PATH": "scenename.txt",
+        "OBS_PORT": obs_port,
+        "METRICS_PORT": None,
+        "FEATURES": features,
+        "STATE_BACKEND": state,
+    }
+    path = os.path.join(workdir, "config.json")
+    with open(path, "w") as f:
+        json.dump(config, f)
+    return path
+
+
+class LoopThread:
+    # The bot's event loop on a background thread, as Application would run
+    # it; scenarios are submitted to it while the main thread waits on the stub.
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True, name="bench-loop")
+        self.thread.start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+
+def load_runtime(workdir, roots, obs_port, features, loop, state="memory"):
+    write_config(workdir, roots, obs_port, features, state)
+    os.chdir(workdir)
+    sys.path.insert(0, REPO_ROOT)
+    from obsbot.app import Runtime, setup_logging
+    from obsbot.config import load_config
+    config = load_config("config.json")
+    setup_logging(config.log_file)
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if type(handler) is logging.StreamHandler:
+            root.removeHandler(handler)
+    runtime = Runtime(config)
+    loop.run(runtime.start())
+    return runtime
+
+
+def library_roots(library):
+    return sorted(os.path.join(library, d, s) for d in os.listdir(library)
+                  for s in os.listdir(os.path.join(library, d)))
+
+
+def wait_for(predicate, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+# === SCENARIOS ===
+async def ui_scenarios(runtime, bot, iterations, rng):
+    from obsbot import handlers as mod
+    results = {}
+    user_ids = iter(range(1_000_000, 2_000_000))
+    sessions = {}
+    bot_data = {"runtime": runtime}
+
+    def session(uid):
+        return sessions.setdefault(uid, FakeContext(bot, bot_data=bot_data))
+
+    results["start"] = await measure(
+        (lambda uid=next(user_ids): mod.start(command_update(bot, uid, "/start"), session(uid)))
+        for _ in range(iterations))
+
+    def search_call():
+        uid = next(user_ids)
+        keyword = rng.choice(WORDS).lower()
+        ctx = FakeContext(bot, bot_data=bot_data, args=[keyword])
+        sessions[uid] = ctx
+        return mod.search(command_update(bot, uid, f"/search {keyword}"), ctx)
+
+    results["search"] = await measure(search_call for _ in range(iterations))
+
+    browse_uid = next(user_ids)
+    ctx = session(browse_uid)
+    results["button_folder"] = await measure(
+        (lambda: mod.button_callback(callback_update(bot, browse_uid, "folder_0"), ctx))
+        for _ in range(max(1, iterations // 10)))
+
+    if runtime.tree:
+        nodes = [n for root in runtime.tree.roots for n in runtime.tree.children(root)] or runtime.tree.roots
+        results["button_dir"] = await measure(
+            (lambda n=rng.choice(nodes): mod.button_callback(callback_update(bot, browse_uid, f"dir_{n.id}_0"), ctx))
+            for _ in range(iterations))
+        results["button_tree_files"] = await measure(
+            (lambda: mod.button_callback(callback_update(bot, browse_uid, f"treefiles_{runtime.tree.roots[0].id}"), ctx))
+            for _ in range(max(1, iterations // 10)))
+
+    files_per_page = runtime.config.files_per_page
+    browsed = runtime.library.view(ctx.user_data.get("view", "all"))
+    total_pages = max(1, len(browsed) // files_per_page)
+    results["button_page"] = await measure(
+        (lambda p=rng.randrange(total_pages): mod.button_callback(callback_update(bot, browse_uid, f"page_{p}"), ctx))
+        for _ in range(iterations))
+
+    sorts = ["az", "za", "new", "old", "trend"]
+    for sort in sorts:
+        results[f"button_sort_{sort}"] = await measure(
+            (lambda: mod.button_callback(callback_update(bot, browse_uid, f"sort_{sort}"), ctx))
+            for _ in range(max(1, iterations // 10)))
+
+    results["button_file"] = await measure(
+        (lambda i=rng.choice(browsed)["id"]: mod.button_callback(callback_update(bot, browse_uid, f"file_{i}"), ctx))
+        for _ in range(iterations))
+
+    # Multi-select: toggles re-render the page; one batch add of five picks.
+    await mod.button_callback(callback_update(bot, browse_uid, "multi_on"), ctx)
+    on_page = browsed[:files_per_page]
+    results["button_pick"] = await measure(
+        (lambda i=rng.choice(on_page)["id"]: mod.button_callback(callback_update(bot, browse_uid, f"pick_{i}"), ctx))
+        for _ in range(iterations))
+
+    async def batch_add():
+        ctx.user_data["multi"] = True
+        ctx.user_data["selected"] = [f["id"] for f in rng.sample(on_page, min(5, len(on_page)))]
+        await mod.button_callback(callback_update(bot, browse_uid, "add_selected"), ctx)
+
+    results["add_selected"] = await measure(batch_add for _ in range(max(1, iterations // 10)))
+
+    if runtime.timeline is not None:
+        # A committed batch of 25 picks from 25 users, then /schedule from each of them.
+        batch = rng.sample(browsed, min(25, len(browsed)))
+        for n, f in enumerate(batch):
+            runtime.timeline.picked(f["path"], 3_000_000 + n)
+        runtime.timeline.begin(time.time(), len(batch))
+        for f in batch:
+            runtime.timeline.append(f["path"], rng.uniform(180, 420))
+        # As the leader's ETA task does; a shared backend serves /schedule from it.
+        runtime.state.set_timeline(runtime.timeline.export())
+        results["schedule"] = await measure(
+            (lambda uid=3_000_000 + n % len(batch): mod.schedule(command_update(bot, uid, "/schedule"), FakeContext(bot, bot_data=bot_data)))
+            for n in range(iterations))
+        if not bot.last_text.startswith("📅"):
+            raise RuntimeError(f"/schedule did not see the committed batch: {bot.last_text}")
+        runtime.timeline.clear()
+        runtime.state.set_timeline(runtime.timeline.export())
+
+    results["list_queue"] = await measure(
+        (lambda: mod.list_queue(command_update(bot, browse_uid, "/list"), FakeContext(bot, bot_data=bot_data)))
+        for _ in range(iterations))
+
+    if runtime.inline_search:
+        results.update(await inline_scenarios(runtime, bot, iterations, rng))
+    return results
+
+
+def autofill_scenarios(runtime, iterations, rng):
+    # Slot generation over the whole library, with made-up durations cached
+    # for every file. The first build pays for the weight table.
+    from obsbot.autofill import AutoProgrammer
+    files = runtime.library.files()
+    runtime.durations.put_many([(f, rng.uniform(120, 600)) for f in files])
+    results = {}
+    for mode in ("popular", "weighted"):
+        programmer = AutoProgrammer(runtime.library, runtime.popularity, runtime.durations, mode,
+                                    target_seconds=1800, history_size=200, rng=rng)
+        start = time.perf_counter()
+        programmer.build_slot()
+        cold = time.perf_counter() - start
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            programmer.build_slot()
+            samples.append(time.perf_counter() - start)
+        results[f"autofill_{mode}"] = summarize(samples, sum(samples))
+        results[f"autofill_{mode}"]["cold_ms"] = round(cold * 1000, 3)
+    return results
+
+
+def media_scenarios(runtime, iterations, rng, started):
+    # The synthetic files are empty, so the first pass only measures the pool
+    # plumbing; filters are then timed over made-up metadata for every file.
+    files = runtime.library.files()
+    if not wait_for(lambda: all(runtime.media.get(f) is not None for f in files), 600):
+        raise RuntimeError("media metadata pass never finished")
+    results = {"media_first_pass": {"files": len(files), "seconds": round(time.perf_counter() - started, 2)}}
+    langs = ("tel", "tel", "tel", "hin", "tam", "eng")
+    runtime.media.put_many([(f, {"width": rng.choice((1920, 1280, 854, 3840)), "height": 0,
+                                 "vcodec": rng.choice(("h264", "hevc")), "acodecs": ["aac"],
+                                 "langs": rng.sample(langs, rng.randint(1, 2)), "seconds": 0}) for f in files])
+    runtime.media.sync(files)
+    queries = ["hd:1080 lang:tel", "hd:720", "lang:hin codec:hevc", "hd:2160 lang:tam", "hd:1080 lang:tel song"]
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter()
+        runtime.media.find(f"{queries[i % len(queries)]}|all")
+        samples.append(time.perf_counter() - start)
+    results["facet_query"] = summarize(samples, sum(samples))
+    results["facet_query"]["matches"] = len(runtime.media.find("hd:1080 lang:tel|all"))
+    samples = []
+    for _ in range(iterations):
+        keyword = rng.choice(WORDS).lower()
+        start = time.perf_counter()
+        [f for f in files if keyword in f["name"].lower() and "1080p" in f["name"]]
+        samples.append(time.perf_counter() - start)
+    results["name_scan_for_comparison"] = summarize(samples, sum(samples))
+    return results
+
+
+def state_scenarios(runtime, iterations):
+    # Raw cost of the state backend operations a click pays for.
+    state = runtime.state
+    results = {}
+    for name, op in (("state_rate_limit", lambda i: state.check_rate_limit(3_000_000 + i, 60)),
+                     ("state_session", lambda i: state.put_session(i, {"view": "all", "page": i})
+                      or state.get_session(i)),
+                     ("state_queue", lambda i: state.push_queue([f"bench-{i}.mp4"]) or state.take_queue())):
+        samples = []
+        for i in range(iterations):
+            start = time.perf_counter()
+            op(i)
+            samples.append(time.perf_counter() - start)
+        results[name] = summarize(samples, sum(samples))
+    return results
+
+
+async def inline_scenarios(runtime, bot, iterations, rng):
+    # Type the start of random titles one character at a time, as a user
+    # would in "@bot neet...". Each keystroke is one inline query.
+    from obsbot import handlers as mod
+    ctx = FakeContext(bot, bot_data={"runtime": runtime})
+    files = runtime.library.files()
+    keystrokes = []
+    for _ in range(max(1, iterations // 10)):
+        name = rng.choice(files)["name"].lower()
+        typed = " ".join(name.split()[:2])
+        keystrokes.extend(typed[:n] for n in range(1, len(typed) + 1))
+    results = {"inline_keystroke": await measure(
+        (lambda text=text: mod.inline_query(inline_update(bot, 7, text), ctx)) for text in keystrokes)}
+    results["inline_next_page"] = await measure(
+        (lambda text=text: mod.inline_query(inline_update(bot, 7, text, "50"), ctx)) for text in keystrokes)
+    results["inline_keystroke"]["p99_under_50ms"] = results["inline_keystroke"]["p99_ms"] < 50
+    return results
+
+
+async def traffic_run(runtime, stub, bot, viewers, rng):
+    # One movie and the break after it, compressed TRAFFIC_SCALE times, with
+    # every try going through the real handlers against the OBS stub. Each
+    # viewer wants one pick: /start, then a file button. Whatever the bot
+    # answers decides what the viewer does next; a turned-away viewer tries
+    # again in about RETRY_SECONDS, or a few seconds after the break shows up
+    # on screen. Arrivals are counted per virtual second.
+    from obsbot import handlers as mod
+    files = runtime.library.files()
+    bot_data = {"runtime": runtime}
+    per_second = Counter()
+    accepted = 0
+    clock = time.perf_counter()
+    break_started = asyncio.Event()
+
+    def now():
+        return (time.perf_counter() - clock) * TRAFFIC_SCALE
+
+    async def send(handler, update, uid):
+        per_second[int(now())] += 1
+        bot.replies.pop(uid, None)
+        await handler(update, FakeContext(bot, bot_data=bot_data))
+        return not (bot.replies.get(uid) or "").startswith(REJECTED)
+
+    async def viewer(uid):
+        nonlocal accepted
+        await asyncio.sleep(rng.uniform(0, MOVIE_SECONDS) / TRAFFIC_SCALE)
+        while True:
+            if (await send(mod.start, command_update(bot, uid, "/start"), uid) and
+                    await send(mod.button_callback, callback_update(bot, uid, f"file_{rng.choice(files)['id']}"), uid)):
+                accepted += 1
+                return
+            wait = RETRY_SECONDS * rng.uniform(0.5, 1.5)
+            if not break_started.is_set() and now() + wait >= MOVIE_SECONDS:
+                wait = MOVIE_SECONDS - now() + rng.expovariate(1 / BREAK_RETURN_SECONDS)
+            await asyncio.sleep(max(0.0, wait) / TRAFFIC_SCALE)
+
+    async def broadcast():
+        await asyncio.sleep(MOVIE_SECONDS / TRAFFIC_SCALE)
+        stub.scene = "filler"
+        await runtime.obs.poll()
+        break_started.set()
+        await asyncio.sleep(BREAK_SECONDS / TRAFFIC_SCALE)
+
+    stub.scene = "movie"
+    await runtime.obs.poll()
+    tasks = [asyncio.create_task(viewer(5_000_000 + n)) for n in range(viewers)]
+    await broadcast()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return {"viewers": viewers, "accepted": accepted, "updates": sum(per_second.values()),
+            "peak_per_s": max(per_second.values()),
+            "first_10s_of_break": sum(n for s, n in per_second.items() if 0 <= s - MOVIE_SECONDS < 10)}
+
+
+def prebook_scenario(runtime, stub, bot, loop, iterations, rng):
+    # Retry traffic with and without pre-booking, then picks made while a
+    # movie is on air and the single commit at the break. TIME_LIMIT is in
+    # real seconds, so it is off while time is compressed.
+    from obsbot import handlers as mod
+    from obsbot.obs import PLAYLIST_INPUT
+    viewers = max(50, iterations)
+    config = runtime.config
+    results = {}
+    for name, limit in (("traffic_reject", 0), ("traffic_prebook", viewers)):
+        runtime.config = replace(config, time_limit=0, prebook_limit=limit, prebook_per_user=2)
+        results[name] = loop.run(traffic_run(runtime, stub, bot, viewers, rng))
+        wait_for(lambda: not runtime.state.queue() and not runtime.state.prebooked(), 10)
+    runtime.config = replace(config, prebook_limit=viewers, prebook_per_user=2)
+    stub.scene = "movie"
+    if not wait_for(lambda: mod.movie_playing(runtime), 15):
+        raise RuntimeError("bot never saw the movie scene")
+    files = runtime.library.files()
+    ctx = FakeContext(bot, bot_data={"runtime": runtime})
+    results["prebook_pick"] = loop.run(measure(
+        (lambda uid=uid: mod.button_callback(callback_update(bot, uid, f"file_{rng.choice(files)['id']}"), ctx))
+        for uid in range(4_000_000, 4_000_000 + iterations)))
+    booked = len(runtime.state.prebooked())
+    queued = len(runtime.state.queue() or [])
+    stub.committed.clear()
+    stub.scene = "filler"
+    start = time.perf_counter()
+    if not stub.committed.wait(timeout=30):
+        raise RuntimeError("pre-booked picks were never committed")
+    results["prebook_commit"] = {"booked": booked, "queued": queued,
+                                 "committed": len(stub.inputs[PLAYLIST_INPUT]["playlist"]),
+                                 "ms": round((time.perf_counter() - start) * 1000, 1)}
+    runtime.config = config
+    return results
+
+
+def monitor_scenario(runtime, stub, roots, cycles):
+    # Time from "filler scene with a non-empty queue" until the playlist lands in OBS.
+    samples = []
+    files = sorted(os.listdir(roots[0]))[:3]
+    wall_start = time.perf_counter()
+    for _ in range(cycles):
+        stub.committed.clear()
+        runtime.state.push_queue([os.path.join(roots[0], name) for name in files])
+        stub.scene = "filler"
+        start = time.perf_counter()
+        if not stub.committed.wait(timeout=30):
+            raise RuntimeError("monitor_obs never committed the playlist")
+        samples.append(time.perf_counter() - start)
+        wait_for(lambda: not runtime.state.queue(), 10)
+    stats = summarize(samples, time.perf_counter() - wall_start)
+    stats["obs_requests"] = dict(stub.requests)
+    return stats
+
+
+def run(args):
+    rng = random.Random(args.seed)
+    workdir = tempfile.mkdtemp(prefix="obsbot-bench-")
+    library = args.library or os.path.join(workdir, "library")
+    started = time.perf_counter()
+    if args.library and os.path.isdir(library):
+        roots = library_roots(library)
+    else:
+        roots = make_library(library, args.files, args.folders, args.nested, seed=args.seed)
+    library_seconds = time.perf_counter() - started
+
+    stub = ObsStub().start()
+    stub.lock_scene = True
+    features = args.features.split(",")
+    loop = LoopThread()
+    started = time.perf_counter()
+    runtime = load_runtime(workdir, roots, stub.port, features, loop, args.state)
+    if not wait_for(lambda: runtime.scene.connected, 15):
+        raise RuntimeError("bot never connected to the OBS stub")
+
+    scan_samples = []
+    for _ in range(args.scans):
+        start = time.perf_counter()
+        runtime.library.scan()
+        scan_samples.append(time.perf_counter() - start)
+    tracemalloc.start()
+    runtime.library.scan()
+    scan_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    bot = FakeBot()
+    scenarios = {"scan": summarize(scan_samples, sum(scan_samples))}
+    scenarios.update(autofill_scenarios(runtime, args.iterations, rng))
+    scenarios.update(state_scenarios(runtime, args.iterations))
+    if runtime.media:
+        scenarios.update(media_scenarios(runtime, args.iterations, rng, started))
+    scenarios.update(loop.run(ui_scenarios(runtime, bot, args.iterations, rng)))
+
+    if args.obs_cycles and "obs" in features:
+        scenarios.update(prebook_scenario(runtime, stub, bot, loop, args.iterations, rng))
+    stub.lock_scene = False
+    if args.obs_cycles and "obs" in features:
+        scenarios["monitor_obs_commit"] = monitor_scenario(runtime, stub, roots, args.obs_cycles)
+    loop.run(runtime.stop())
+    loop.close()
+    stub.stop()
+    os.chdir(REPO_ROOT)
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "features": features,
+            "state": args.state,
+            "files": args.files,
+            "folders": len(roots),
+            "iterations": args.iterations,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "library_build_s": round(library_seconds, 2),
+        },
+        "scenarios": scenarios,
+        "memory": {"scan_peak_alloc_bytes": scan_peak, "peak_rss_kb": peak_rss_kb()},
+        "telegram_calls": dict(bot.calls),
+    }
+
+
+# === COMPARE ===
+def compare(old_path, new_path, threshold):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    regressions = 0
+    print(f"{'scenario':24} {'p50 old':>10} {'p50 new':>10} {'p99 old':>10} {'p99 new':>10} {'change':>8}")
+    for name, stats in new["scenarios"].items():
+        before = old["scenarios"].get(name)
+        if "p50_ms" not in stats or (before and "p50_ms" not in before):
+            # Counts rather than latencies (traffic models, first passes, commits).
+            continue
+        if not before:
+            print(f"{name:24} {'-':>10} {stats['p50_ms']:>10} {'-':>10} {stats['p99_ms']:>10} {'new':>8}")
+            continue
+        change = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0.0
+        flag = ""
+        if change > threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        print(f"{name:24} {before['p50_ms']:>10} {stats['p50_ms']:>10} {before['p99_ms']:>10} "
+              f"{stats['p99_ms']:>10} {change:>7.1f}%{flag}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m bench", description="Offline bot benchmarks")
+    sub = parser.add_subparsers(dest="command")
+    run_parser = sub.add_parser("run", help="run the benchmark and print JSON results")
+    run_parser.add_argument("--features", default="folders,search,inline,obs,eta", help="comma separated FEATURES")
+    run_parser.add_argument("--files", type=int, default=100000)
+    run_parser.add_argument("--folders", type=int, default=4)
+    run_parser.add_argument("--nested", type=int, default=0, help="spread a third of the files over N subfolders")
+    run_parser.add_argument("--library", help="reuse (or create) a synthetic library at this path")
+    run_parser.add_argument("--iterations", type=int, default=200)
+    run_parser.add_argument("--scans", type=int, default=5)
+    run_parser.add_argument("--obs-cycles", type=int, default=2)
+    run_parser.add_argument("--seed", type=int, default=1)
+    run_parser.add_argument("--state", choices=("memory", "sqlite"), default="memory", help="STATE_BACKEND")
+    run_parser.add_argument("--output", help="write JSON here instead of stdout")
+    compare_parser = sub.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("old")
+    compare_parser.add_argument("new")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="allowed p50 slowdown in %%")
+    startup_parser = sub.add_parser("startup", help="measure cold start to first answered update")
+    startup_parser.add_argument("--files", type=int, default=100000)
+    startup_parser.add_argument("--library", help="reuse (or create) a synthetic library at this path")
+    startup_parser.add_argument("--budget-ms", type=float, help="override STARTUP_BUDGET_MS")
+    sub.add_parser("media", help="check the MP4/MKV header parsers on hand-built samples")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        return compare(args.old, args.new, args.threshold)
+    if args.command == "startup":
+        from bench.startup import run_startup
+        return run_startup(args)
+    if args.command == "media":
+        from bench.media_samples import run_media_check
+        return run_media_check(args)
+    if args.command != "run":
+        parser.print_help()
+        return 2
+    results = run(args)
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import asyncio
+import tempfile
+import subprocess
+
+from bench.library import make_library
+from bench.run import REPO_ROOT, write_config, library_roots
+
+# Cold start is measured in a fresh interpreter so nothing is already imported.
+# The probe times: package import, Runtime + Application construction, the
+# first reply (possibly "loading"), and the first /start and /search that show
+# the library while the index warms up.
+
+LAZY_MODULES = ("obsws_python", "telegram.ext._application")
+FOLDER_COUNT = re.compile(r" — (\d+) files")
+
+
+def buttons(bot):
+    markup = bot.last_markup
+    return [button for row in markup.inline_keyboard for button in row] if markup else []
+
+
+def real_reply(bot, kind):
+    # A fast reply only counts if it shows the library: a folder with files
+    # for /start, a page of file buttons for /search.
+    if kind == "start":
+        return any(int(m.group(1)) for m in (FOLDER_COUNT.search(b.text) for b in buttons(bot)) if m)
+    return any(b.callback_data.startswith("file_") for b in buttons(bot))
+
+
+def probe():
+    t0 = time.perf_counter()
+    from obsbot.app import Runtime, build_application
+    from obsbot.config import load_config
+    from obsbot import handlers
+    t_import = time.perf_counter()
+
+    config = load_config("config.json")
+    runtime = Runtime(config)
+    build_application(runtime)
+
+    from bench.fakes import FakeBot, FakeContext, command_update
+    bot = FakeBot()
+    bot_data = {"runtime": runtime}
+
+    async def answered(kind, handler, update, args=None):
+        # Sends the update again while the bot answers "loading" (the loop
+        # is never blocked on the scan); returns when the first real answer came.
+        deadline = time.perf_counter() + 60
+        while True:
+            await handler(update, FakeContext(bot, bot_data=bot_data, args=args))
+            if bot.last_text != handlers.LIBRARY_LOADING_TEXT or time.perf_counter() > deadline:
+                break
+            loading[kind] += 1
+            if kind not in first_reply:
+                first_reply[kind] = time.perf_counter()
+            await asyncio.sleep(0.02)
+        first_reply.setdefault(kind, time.perf_counter())
+        replies[kind] = (real_reply(bot, kind), bot.last_text)
+        return time.perf_counter()
+
+    async def first_updates():
+        await runtime.start()
+        t_ready = time.perf_counter()
+        t_start = await answered("start", handlers.start, command_update(bot, 1, "/start"))
+        t_search = await answered("search", handlers.search, command_update(bot, 2, "/search song"), ["song"])
+        await runtime.stop()
+        return t_ready, t_start, t_search
+
+    replies = {}
+    loading = {"start": 0, "search": 0}
+    first_reply = {}
+    t_ready, t_start, t_search = asyncio.run(first_updates())
+    print(json.dumps({
+        "import_ms": round((t_import - t0) * 1000, 1),
+        "ready_ms": round((t_ready - t0) * 1000, 1),
+        "first_reply_ms": round((first_reply["start"] - t0) * 1000, 1),
+        "loading_replies": loading,
+        "first_start_ms": round((t_start - t0) * 1000, 1),
+        "first_search_ms": round((t_search - t0) * 1000, 1),
+        "budget_ms": config.startup_budget_ms,
+        "imported_at_start": {name: name in sys.modules for name in LAZY_MODULES},
+        "telegram_calls": dict(bot.calls),
+        "replies_ok": all(ok for ok, _ in replies.values()),
+        "replies": {name: text for name, (_, text) in replies.items()},
+    }))
+
+
+def run_startup(args):
+    workdir = tempfile.mkdtemp(prefix="obsbot-startup-")
+    library = args.library or os.path.join(workdir, "library")
+    if args.library and os.path.isdir(library):
+        roots = library_roots(library)
+    else:
+        roots = make_library(library, args.files)
+    write_config(workdir, roots, 1, ["folders", "search"])
+    with open(os.path.join(workdir, "scenename.txt"), "w") as f:
+        f.write("filler")
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    output = subprocess.run([sys.executable, "-m", "bench.startup", "--probe"], cwd=workdir, env=env,
+                            stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout
+    shutil.rmtree(workdir, ignore_errors=True)
+    result = json.loads(output.strip().splitlines()[-1])
+    if args.budget_ms:
+        result["budget_ms"] = args.budget_ms
+    result["within_budget"] = result["first_start_ms"] <= result["budget_ms"]
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    if not result["replies_ok"]:
+        print("First replies did not show the library:", result["replies"], file=sys.stderr)
+    return 0 if result["within_budget"] and result["replies_ok"] else 1
+
+
+if __name__ == '__main__':
+    if "--probe" in sys.argv:
+        probe()
@@ -0,0 +1,2 @@
+# Telegram bot that lets viewers queue videos for the OBS "select" scene.
+# Run with: python -m obsbot   (reads config.json from the working directory)
@@ -0,0 +1,221 @@
+import os
+import re
+import sys
+import json
+import math
+import heapq
+import time
+import logging
+from datetime import datetime
+
+# Popularity analytics built from bot_actions.log.
+# Every "Selected file ..." line is one vote. Scores decay with a half-life, and
+# because every score decays by the same factor, the rank key
+#   log2(score) + ts / half_life
+# never changes as time passes. That lets us keep an incremental top-K heap.
+
+SELECT_PATTERNS = [
+    # obstelautov2: Selected file 'name' from folder 'folder' by user (id)
+    re.compile(r"Selected file '(?P<name>.+)' from folder '(?P<folder>.+)' by .*\((?P<uid>-?\d+)\)\s*$"),
+    # obsbotv6/v7: 12345 added file: path
+    re.compile(r"(?P<uid>-?\d+) added file: (?P<path>.+?)\s*$"),
+    # obsbot multi-select: Selected 3 files by user (id): ["path", ...]
+    re.compile(r"Selected \d+ files by .*\((?P<uid>-?\d+)\): (?P<paths>\[.*\])\s*$"),
+]
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+MIN_SCORE = 0.01
+
+
+def parse_selections(line):
+    # Returns a (path, ts) pair for every file the line selected.
+    for pattern in SELECT_PATTERNS:
+        m = pattern.search(line)
+        if not m:
+            continue
+        groups = m.groupdict()
+        if groups.get("paths"):
+            try:
+                paths = json.loads(groups["paths"])
+            except ValueError:
+                return []
+        else:
+            paths = [groups.get("path") or os.path.join(groups["folder"], groups["name"])]
+        try:
+            ts = datetime.strptime(line[:19], TIMESTAMP_FORMAT).timestamp()
+        except ValueError:
+            ts = time.time()
+        return [(path, ts) for path in paths]
+    return []
+
+
+class PopularityStore:
+    def __init__(self, store_path, half_life_hours=72, top_k=200):
+        self.store_path = store_path
+        self.half_life = half_life_hours * 3600.0
+        self.top_k = top_k
+        self.scores = {}        # path -> [score, ts]
+        self.log_offsets = {}   # log path -> bytes already consumed
+        self._top = {}          # path -> rank of current top-K members
+        self._heap = []         # min-heap of (rank, path), may hold stale entries
+        self._top_cache = None
+        self.version = 0        # bumped whenever the top-K order may have changed
+        self._dirty = False
+
+    # === RANKING ===
+    def _rank(self, score, ts):
+        return math.log2(score) + ts / self.half_life
+
+    def decayed(self, path, now=None):
+        entry = self.scores.get(path)
+        if not entry:
+            return 0.0
+        now = time.time() if now is None else now
+        score, ts = entry
+        return score * 0.5 ** ((now - ts) / self.half_life)
+
+    def _heap_min(self):
+        while self._heap and self._top.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else None
+
+    def _offer(self, path, rank):
+        # Ranks only ever grow, so a member never needs to move down.
+        if path not in self._top and len(self._top) >= self.top_k:
+            if rank <= self._heap_min():
+                return
+        self._top[path] = rank
+        heapq.heappush(self._heap, (rank, path))
+        while len(self._top) > self.top_k:
+            self._heap_min()
+            _, evicted = heapq.heappop(self._heap)
+            del self._top[evicted]
+        self._top_cache = None
+        self.version += 1
+
+    def _rebuild_top(self):
+        ranked = heapq.nlargest(self.top_k, ((self._rank(s, t), p) for p, (s, t) in self.scores.items()))
+        self._top = {p: r for r, p in ranked}
+        self._heap = list(ranked)
+        heapq.heapify(self._heap)
+        self._top_cache = None
+        self.version += 1
+
+    # === UPDATES ===
+    def record(self, path, ts=None):
+        ts = time.time() if ts is None else ts
+        entry = self.scores.get(path)
+        if entry:
+            score, last = entry
+            if ts >= last:
+                score = score * 0.5 ** ((ts - last) / self.half_life) + 1
+            else:
+                # Out-of-order line (e.g. rebuilding from rotated logs): decay the vote instead.
+                score += 0.5 ** ((last - ts) / self.half_life)
+                ts = last
+        else:
+            score = 1.0
+        self.scores[path] = [score, ts]
+        self._offer(path, self._rank(score, ts))
+        self._dirty = True
+
+    def ingest(self, log_path):
+        # Consume only the bytes appended since the last call.
+        try:
+            size = os.path.getsize(log_path)
+        except OSError:
+            return 0
+        offset = self.log_offsets.get(log_path, 0)
+        if size < offset:
+            offset = 0  # log was truncated or rotated
+        if size == offset:
+            return 0
+        count = 0
+        with open(log_path, "rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # partial line still being written
+                offset += len(raw)
+                for path, ts in parse_selections(raw.decode("utf-8", errors="replace")):
+                    self.record(path, ts)
+                    count += 1
+        if offset != self.log_offsets.get(log_path):
+            self.log_offsets[log_path] = offset
+            self._dirty = True
+        return count
+
+    def rebuild(self, log_paths):
+        self.scores.clear()
+        self.log_offsets.clear()
+        self._top.clear()
+        self._heap.clear()
+        total = 0
+        for log_path in log_paths:
+            total += self.ingest(log_path)
+        self._dirty = True
+        return total
+
+    # === QUERIES ===
+    def top(self, now=None):
+        if self._top_cache is None:
+            ordered = sorted(self._top.items(), key=lambda kv: kv[1], reverse=True)
+            self._top_cache = [path for path, _ in ordered]
+        return [(path, self.decayed(path, now)) for path in self._top_cache]
+
+    def order_map(self):
+        if self._top_cache is None:
+            self.top()
+        return {path: i for i, path in enumerate(self._top_cache)}
+
+    # === PERSISTENCE ===
+    def save(self, force=False):
+        if not (self._dirty or force):
+            return
+        now = time.time()
+        scores = {p: [round(s, 4), int(t)] for p, (s, t) in self.scores.items()
+                  if self.decayed(p, now) >= MIN_SCORE}
+        data = {"v": 1, "half_life": self.half_life, "logs": self.log_offsets, "scores": scores}
+        tmp = self.store_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, self.store_path)
+        self._dirty = False
+
+    @classmethod
+    def load(cls, store_path, half_life_hours=72, top_k=200):
+        store = cls(store_path, half_life_hours, top_k)
+        try:
+            with open(store_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return store
+        if data.get("half_life") != store.half_life:
+            # Scores were decayed with a different half-life; rebuild from the logs instead.
+            logging.info("Popularity half-life changed, rebuilding from logs")
+            return store
+        store.scores = {p: [float(s), float(t)] for p, (s, t) in data.get("scores", {}).items()}
+        store.log_offsets = data.get("logs", {})
+        store._rebuild_top()
+        return store
+
+    def refresh(self, log_path):
+        if self.ingest(log_path):
+            self.save()
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description="Rebuild the popularity store from action logs")
+    parser.add_argument("logs", nargs="+", help="log files, oldest first (e.g. bot_actions.log.2 bot_actions.log.1 bot_actions.log)")
+    parser.add_argument("--store", default="popularity.json")
+    parser.add_argument("--half-life", type=float, default=72, help="hours")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    store = PopularityStore(args.store, args.half_life)
+    count = store.rebuild(args.logs)
+    store.save(force=True)
+    print(f"Ingested {count} selections, {len(store.scores)} titles")
+    for path, score in store.top()[:args.top]:
+        print(f"{score:8.2f}  {path}")
+    sys.exit(0)
@@ -0,0 +1,335 @@
+import os
+import time
+import socket
+import asyncio
+import logging
+from dataclasses import fields, replace
+from urllib.parse import urlsplit
+
+from obsbot.config import ALL_FEATURES, Config, load_config
+from obsbot.library import LibraryIndex
+from obsbot.scanner import Scanner
+from obsbot.analytics import PopularityStore
+from obsbot.metrics import start_http_server, count
+from obsbot.obs import ObsMonitor, FileScene, get_video_duration
+from obsbot.search import InlineSearch
+from obsbot.durations import DurationCache
+from obsbot.tree import FolderTree
+from obsbot.prefetch import Prefetcher
+from obsbot.schedule import Timeline, notify_before_start
+from obsbot.autofill import AutoProgrammer
+from obsbot.state import MemoryState, SqliteState, SharedScene, SharedTimeline
+from obsbot.media import MediaIndex
+
+# Settings baked into objects built at startup; a reload keeps the running
+# values for these and asks for a restart instead.
+RESTART_FIELDS = ("bot_token", "features", "log_file", "popularity_file", "trending_half_life_hours",
+                  "metrics_port", "persistence_file", "persistence_interval", "probe_durations",
+                  "schedule_notify_seconds", "autofill", "autofill_history", "config_reload_seconds",
+                  "state_backend", "state_file", "webhook_url", "webhook_listen", "webhook_port")
+LEASE_SECONDS = 15
+
+
+class Runtime:
+    # Everything the handlers share. Stored in application.bot_data["runtime"].
+    # Handlers read self.config on every update, so a reload is a single
+    # reference swap; apply_config pushes the rest into the running parts.
+    # With a shared state backend several workers run side by side; the one
+    # holding the leader lease talks to OBS and scans the library, the others
+    # follow the scene and library snapshot it publishes.
+
+    def __init__(self, config, config_path=None, default_features=ALL_FEATURES):
+        self.config = config
+        self.config_path = config_path
+        self.default_features = default_features
+        self.persistence = None
+        self.rate_limits = {}
+        shared = config.state_backend == "sqlite"
+        if config.persistence_file:
+            from obsbot.persistence import SqlitePersistence
+            self.persistence = SqlitePersistence(config.persistence_file, config.persistence_interval)
+            if not shared:
+                self.rate_limits = self.persistence.load_rate_limits(config.time_limit)
+        if shared:
+            self.state = SqliteState(config.state_file)
+        else:
+            self.state = MemoryState(config.notepad_file, self.rate_limits, config.prebook_file)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.leading = not shared
+        self.library = LibraryIndex(config.video_folders, config.library_refresh_seconds,
+                                    Scanner(config.scan_workers, config.scan_retry_seconds))
+        if self.persistence:
+            self.library.listeners.append(self.publish_library)
+        self.popularity = PopularityStore.load(config.popularity_file, config.trending_half_life_hours)
+        self.inline_search = None
+        if config.has("inline"):
+            self.inline_search = InlineSearch(self.library, self.popularity)
+            self.library.installed.append(self.inline_search.rebuild)
+        self.durations = DurationCache(config.persistence_file or ":memory:", background=config.probe_durations)
+        self.tree = None
+        if config.has("folders"):
+            self.tree = FolderTree(self.library, self.durations)
+            self.library.installed.append(self.tree.sync)
+            self.library.sources["dir"] = self.tree.dir_files
+            self.library.sources["tree"] = self.tree.subtree_files
+            self.durations.listeners.append(self.tree.set_duration)
+        self.media = None
+        if config.has("media"):
+            self.media = MediaIndex(config.persistence_file or ":memory:", self.library, self.durations,
+                                    config.media_workers)
+            self.library.listeners.append(self.media.sync)
+            self.library.followed.append(self.media.pick_up)
+            self.library.sources["find"] = self.media.find
+            self.library.source_versions["find"] = lambda: self.media.version
+        self.library.listeners.append(self.durations.request)
+        self.library.followed.append(self.durations.pick_up)
+        self.prefetcher = None
+        self.obs = None
+        self.timeline = Timeline() if config.has("eta") else None
+        # /schedule on a shared backend reads the timeline the leader published.
+        self.shared_timeline = SharedTimeline(self.state) if shared and self.timeline else None
+        self.autofill = None
+        if config.autofill:
+            self.autofill = AutoProgrammer(self.library, self.popularity, self.durations, config.autofill,
+                                           config.autofill_minutes * 60, config.autofill_history)
+        if config.has("obs"):
+            if config.prefetch_items:
+                self.prefetcher = Prefetcher(config.prefetch_items, config.prefetch_mb, config.prefetch_mbps)
+            self.obs = ObsMonitor(config, eta=config.has("eta"), prefetcher=self.prefetcher,
+                                  duration_of=self.duration_of, timeline=self.timeline, autofill=self.autofill,
+                                  backend=self.state)
+            self.scene = SharedScene(self.state) if shared else self.obs
+        else:
+            self.scene = FileScene(config.scene_path)
+        self.started = False
+        self._tasks = []
+        self._leader_tasks = []
+
+    async def start(self, bot=None):
+        # Application.post_init. Cheap: slow work goes to background threads
+        # (library scan) or to tasks on this loop (OBS, reminders).
+        if self.started:
+            return
+        self.started = True
+        if self.state.shared:
+            if self.obs:
+                await self.scene.refresh()
+            self.library.follow(self.state.library_version, self.persistence.load_library)
+            self._tasks.append(asyncio.create_task(self.lead(bot), name="leader-lease"))
+        else:
+            self.library.warm(self.persistence.load_library if self.persistence else None)
+            await self.start_leading(bot)
+        if self.config_path and self.config.config_reload_seconds:
+            self._tasks.append(asyncio.create_task(self.watch_config(), name="config-watch"))
+        # Counters are per process, so each worker of a shared setup serves
+        # its own; OBSBOT_METRICS_PORT gives each one a port, like the webhook.
+        port = int(os.environ.get("OBSBOT_METRICS_PORT", self.config.metrics_port or 0))
+        if port:
+            try:
+                start_http_server(port)
+            except OSError as e:
+                logging.warning(f"Metrics disabled, port {port} is unavailable ({e.strerror}); "
+                                f"set OBSBOT_METRICS_PORT per worker")
+        self.popularity.refresh(self.config.log_file)
+
+    async def stop(self):
+        # Application.post_shutdown: cancels the OBS tasks and waits for any
+        # request still in flight before the loop goes away.
+        if not self.started:
+            return
+        self.started = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if not self.state.shared:
+            await self.stop_leading()
+        self.state.close()
+
+    # === LEADERSHIP ===
+    async def start_leading(self, bot=None):
+        self.leading = True
+        await (self.obs or self.scene).start()
+        if self.timeline and bot and self.config.schedule_notify_seconds:
+            self._leader_tasks.append(asyncio.create_task(
+                notify_before_start(self.timeline, bot, self.config.schedule_notify_seconds), name="schedule-notify"))
+
+    async def stop_leading(self):
+        self.leading = False
+        for task in self._leader_tasks:
+            task.cancel()
+        await asyncio.gather(*self._leader_tasks, return_exceptions=True)
+        self._leader_tasks = []
+        await (self.obs or self.scene).stop()
+
+    async def lead(self, bot=None):
+        # Shared backend: renew the leader lease, or take it over once the
+        # previous leader stopped renewing (crashed or shut down). Its own
+        # thread, not the state thread, so queued handler calls never delay a
+        # renewal; a renewal that fails keeps the lead until the lease runs out.
+        renewed = 0.0
+        try:
+            while True:
+                try:
+                    held = await asyncio.to_thread(self.state.acquire_lease, "leader", self.owner, LEASE_SECONDS)
+                    renewed = time.monotonic()
+                except Exception as e:
+                    logging.warning(f"Could not renew the leader lease: {e}")
+                    held = self.leading and time.monotonic() - renewed < LEASE_SECONDS
+                if held and not self.leading:
+                    logging.info(f"Worker {self.owner} is now the leader")
+                    self.library.lead()
+                    self.library.warm(None if self.library.ready else self.persistence.load_library)
+                    await self.start_leading(bot)
+                elif self.leading and not held:
+                    logging.warning(f"Worker {self.owner} lost the leader lease")
+                    await self.stop_leading()
+                    self.library.follow(self.state.library_version, self.persistence.load_library)
+                await asyncio.sleep(LEASE_SECONDS / 3)
+        finally:
+            if self.leading:
+                await self.stop_leading()
+                await asyncio.to_thread(self.state.release_lease, "leader", self.owner)
+
+    def publish_library(self, files):
+        # Library listener: the leader saves the snapshot and tells followers
+        # which version to load.
+        if self.leading:
+            self.persistence.save_library(files)
+            self.state.set_library_version(f"{self.owner}:{self.library.version}")
+
+    # === CONFIG RELOAD ===
+    async def watch_config(self):
+        # Polls config.json's mtime. An edit that does not load or validate is
+        # logged and ignored; the running config stays in place.
+        path = self.config_path
+        try:
+            seen = os.stat(path).st_mtime_ns
+        except OSError:
+            seen = None
+        while True:
+            await asyncio.sleep(self.config.config_reload_seconds)
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if mtime == seen:
+                continue
+            seen = mtime
+            try:
+                config = load_config(path, self.default_features)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                count("config_reload_errors_total", "config.json edits rejected")
+                logging.warning(f"Ignoring invalid {path}: {e!r}")
+                continue
+            previous = self.config
+            try:
+                await self.apply_config(config)
+            except Exception as e:
+                # Keep watching, and diff the next edit against the old config
+                # so whatever did not get applied is tried again.
+                self.config = previous
+                count("config_reload_errors_total", "config.json edits rejected")
+                logging.exception(f"Could not apply {path}: {e!r}")
+
+    async def apply_config(self, config):
+        old = self.config
+        kept = {name: getattr(old, name) for name in RESTART_FIELDS if getattr(old, name) != getattr(config, name)}
+        if kept:
+            logging.warning(f"Config changes to {', '.join(kept)} need a restart; keeping the running values")
+            config = replace(config, **kept)
+        changed = [f.name for f in fields(Config) if getattr(old, f.name) != getattr(config, f.name)]
+        if not changed:
+            return
+        self.config = config
+        self.library.refresh_seconds = config.library_refresh_seconds
+        self.library.scanner.max_workers = config.scan_workers
+        self.library.scanner.retry_seconds = config.scan_retry_seconds
+        if self.persistence:
+            self.persistence.set_rate_limit_horizon(config.time_limit)
+        if self.prefetcher:
+            self.prefetcher.items = config.prefetch_items
+            self.prefetcher.chunk_bytes = int(config.prefetch_mb * 1024 * 1024)
+            self.prefetcher.bandwidth = config.prefetch_mbps * 1024 * 1024
+        if self.autofill:
+            self.autofill.target_seconds = config.autofill_minutes * 60
+        if self.media:
+            self.media.workers = config.media_workers
+        if not self.state.shared:
+            self.state.notepad_file = config.notepad_file
+            self.state.prebook_file = config.prebook_file
+        if old.video_folders != config.video_folders:
+            added, removed = await asyncio.to_thread(self.library.set_folders, config.video_folders)
+            if self.tree:
+                self.tree.set_roots(config.video_folders)
+            logging.info(f"Video folders added: {added or 'none'}, removed: {removed or 'none'}")
+        await (self.obs or self.scene).reconfigure(config)
+        count("config_reloads_total", "config.json reloads applied")
+        logging.info(f"Config reloaded: {', '.join(changed)}")
+
+    def duration_of(self, path):
+        # Blocking; uses the duration cache for files in the library.
+        file = self.library.by_path(path)
+        return self.durations.lookup(file) if file else get_video_duration(path)
+
+
+def setup_logging(log_file):
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=[logging.FileHandler(log_file), logging.StreamHandler()]
+    )
+
+
+def build_application(runtime):
+    from telegram import Update
+    from telegram.ext import (ApplicationBuilder, CommandHandler, CallbackQueryHandler, InlineQueryHandler,
+                              TypeHandler)
+    from obsbot import handlers
+
+    async def post_init(application):
+        await runtime.start(application.bot)
+
+    async def post_shutdown(application):
+        await runtime.stop()
+
+    config = runtime.config
+    builder = ApplicationBuilder().token(config.bot_token).post_init(post_init).post_shutdown(post_shutdown)
+    if runtime.persistence and not runtime.state.shared:
+        builder = builder.persistence(runtime.persistence)
+    app = builder.build()
+    app.bot_data["runtime"] = runtime
+    if runtime.state.shared:
+        app.add_handler(TypeHandler(Update, handlers.load_session), group=-1)
+        app.add_handler(TypeHandler(Update, handlers.save_session), group=1)
+    app.add_handler(CommandHandler("start", handlers.start))
+    if config.has("search"):
+        app.add_handler(CommandHandler("search", handlers.search))
+    if config.has("inline"):
+        app.add_handler(InlineQueryHandler(handlers.inline_query))
+        app.add_handler(CommandHandler("add", handlers.add_command))
+    app.add_handler(CommandHandler("list", handlers.list_queue))
+    if config.has("eta"):
+        app.add_handler(CommandHandler("schedule", handlers.schedule))
+    app.add_handler(CommandHandler("stats", handlers.stats))
+    app.add_handler(CallbackQueryHandler(handlers.button_callback))
+    return app
+
+
+def main(default_features=ALL_FEATURES, config_path="config.json"):
+    started = time.perf_counter()
+    config = load_config(config_path, default_features)
+    setup_logging(config.log_file)
+    runtime = Runtime(config, config_path, default_features)
+    app = build_application(runtime)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    logging.info(f"Startup took {elapsed_ms:.0f} ms (budget {config.startup_budget_ms} ms), features: {', '.join(config.features)}")
+    print("Bot running... Ctrl+C to stop")
+    if config.webhook_url:
+        # Several workers can sit behind one endpoint (STATE_BACKEND "sqlite");
+        # each listens on its own port, given by OBSBOT_WEBHOOK_PORT.
+        port = int(os.environ.get("OBSBOT_WEBHOOK_PORT", config.webhook_port))
+        app.run_webhook(listen=config.webhook_listen, port=port, url_path=urlsplit(config.webhook_url).path.lstrip("/"),
+                        webhook_url=config.webhook_url)
+    else:
+        app.run_polling()
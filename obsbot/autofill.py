@@ -0,0 +1,113 @@
+import time
+import random
+import bisect
+import logging
+from itertools import accumulate
+
+from obsbot.metrics import timed
+
+# Automatic filler programming.
+# When nobody has queued anything, a slot of about target_seconds is packed
+# from the library: trending titles first ("popular") or a random draw
+# weighted by popularity ("weighted"). Only files with a known duration are
+# eligible, and anything aired within the last history_size items is skipped.
+# The cumulative weight table is rebuilt only when the library, the
+# popularity ranking or the duration cache changed; each draw is a bisect.
+
+MODES = ("popular", "weighted")
+MAX_DRAWS = 500
+
+
+class RecentHistory:
+    # The last `size` aired paths: a ring buffer keeps the order, a dict of
+    # counts answers "aired recently?" in O(1).
+
+    def __init__(self, size):
+        self.size = size
+        self._ring = [None] * size
+        self._next = 0
+        self._counts = {}
+
+    def add(self, path):
+        if not self.size:
+            return
+        old = self._ring[self._next]
+        if old is not None:
+            if self._counts[old] == 1:
+                del self._counts[old]
+            else:
+                self._counts[old] -= 1
+        self._ring[self._next] = path
+        self._counts[path] = self._counts.get(path, 0) + 1
+        self._next = (self._next + 1) % self.size
+
+    def __contains__(self, path):
+        return path in self._counts
+
+    def __len__(self):
+        return sum(self._counts.values())
+
+
+class AutoProgrammer:
+    def __init__(self, library, popularity, durations, mode="weighted", target_seconds=1800, history_size=200,
+                 rng=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown AUTOFILL mode: {mode}")
+        self.library = library
+        self.popularity = popularity
+        self.durations = durations
+        self.mode = mode
+        self.target_seconds = target_seconds
+        self.history = RecentHistory(history_size)
+        self.rng = rng or random.Random()
+        self._table_key = None
+        self._table = ([], [])
+
+    def _candidates(self):
+        key = (self.library.version, self.popularity.version, self.durations.version)
+        if key != self._table_key:
+            now = time.time()
+            files = [f for f in self.library.files() if self.durations.get(f)]
+            if self.mode == "weighted":
+                # +1 so titles nobody picked yet still get airtime.
+                weights = [1.0 + self.popularity.decayed(f["path"], now) for f in files]
+            else:
+                weights = [1.0] * len(files)
+            self._table = (files, list(accumulate(weights)))
+            self._table_key = key
+        return self._table
+
+    @timed("autofill_build_seconds", "filler slot generation")
+    def build_slot(self):
+        files, cumulative = self._candidates()
+        if not files:
+            return []
+        remaining = self.target_seconds
+        chosen = []
+        taken = set()
+
+        def offer(file):
+            nonlocal remaining
+            path = file["path"]
+            seconds = self.durations.get(file)
+            if path in taken or path in self.history or not seconds or seconds > remaining:
+                return
+            taken.add(path)
+            chosen.append(path)
+            remaining -= seconds
+
+        if self.mode == "popular":
+            for path, _ in self.popularity.top():
+                file = self.library.by_path(path)
+                if file:
+                    offer(file)
+        total = cumulative[-1]
+        for _ in range(MAX_DRAWS):
+            if remaining <= 0:
+                break
+            index = bisect.bisect_right(cumulative, self.rng.random() * total)
+            offer(files[min(index, len(files) - 1)])
+        for path in chosen:
+            self.history.add(path)
+        logging.info(f"Auto filler slot: {len(chosen)} items, {self.target_seconds - remaining:.0f}s")
+        return chosen
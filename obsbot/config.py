@@ -0,0 +1,162 @@
+import json
+from dataclasses import dataclass, field, fields
+
+# config.json keys stay the same as the original scripts; everything added since
+# is optional with a default so old config files keep working.
+
+ALL_FEATURES = ("folders", "search", "inline", "obs", "eta", "media")
+AT_LEAST_ONE = ("files_per_page", "scan_workers", "media_workers", "prebook_per_user")
+ABOVE_ZERO = ("trending_half_life_hours", "prefetch_mbps")
+PORTS = ("obs_port", "metrics_port", "webhook_port")
+NULLABLE = ("metrics_port", "persistence_file")    # null turns these off
+
+
+def _list_of(data, key, kind, default=()):
+    # JSON lists only: tuple("F:\\x") would silently become single characters.
+    value = data.get(key, default)
+    if not isinstance(value, (list, tuple)) or not all(isinstance(v, kind) and not isinstance(v, bool) for v in value):
+        raise TypeError(f"{key} must be a list of {kind.__name__}, not {value!r}")
+    return value
+
+
+@dataclass(frozen=True)
+class Config:
+    bot_token: str
+    video_folders: tuple
+    notepad_file: str = "playitems.txt"
+    prebook_file: str = "prebooked.txt"
+    time_limit: int = 60
+    scene_path: str = "scenename.txt"
+    obs_port: int = 4456
+    obs_password: str = "secret"
+    endtime_file: str = "endtime.txt"
+    movie_path: str = "moviename.txt"
+    log_file: str = "bot_actions.log"
+    popularity_file: str = "popularity.json"
+    trending_half_life_hours: float = 72
+    metrics_port: int = 9108
+    admin_ids: frozenset = field(default_factory=frozenset)
+    features: tuple = ALL_FEATURES
+    files_per_page: int = 75
+    library_refresh_seconds: int = 300
+    startup_budget_ms: int = 1500
+    persistence_file: str = "obsbot.sqlite3"
+    persistence_interval: float = 10
+    inline_cache_seconds: int = 300
+    scan_workers: int = 4
+    scan_retry_seconds: int = 60
+    probe_durations: bool = True
+    prefetch_items: int = 3
+    prefetch_mb: float = 64
+    prefetch_mbps: float = 40
+    schedule_notify_seconds: int = 0
+    autofill: str = ""
+    autofill_minutes: float = 30
+    autofill_history: int = 200
+    autofill_input: str = "fillersource"
+    config_reload_seconds: float = 5
+    media_workers: int = 2
+    prebook_limit: int = 0
+    prebook_per_user: int = 2
+    state_backend: str = "memory"
+    state_file: str = "obsbot-state.sqlite3"
+    webhook_url: str = ""
+    webhook_listen: str = "0.0.0.0"
+    webhook_port: int = 8443
+
+    @classmethod
+    def from_dict(cls, data, default_features=ALL_FEATURES):
+        features = tuple(_list_of(data, "FEATURES", str, default_features))
+        unknown = set(features) - set(ALL_FEATURES)
+        if unknown:
+            raise ValueError(f"Unknown FEATURES in config: {', '.join(sorted(unknown))}")
+        if "eta" in features and "obs" not in features:
+            raise ValueError("The 'eta' feature needs the 'obs' feature")
+        autofill = data.get("AUTOFILL", cls.autofill)
+        if autofill and autofill not in ("popular", "weighted"):
+            raise ValueError(f"AUTOFILL must be 'popular' or 'weighted', not {autofill!r}")
+        if autofill and "obs" not in features:
+            raise ValueError("AUTOFILL needs the 'obs' feature")
+        state_backend = data.get("STATE_BACKEND", cls.state_backend)
+        if state_backend not in ("memory", "sqlite"):
+            raise ValueError(f"STATE_BACKEND must be 'memory' or 'sqlite', not {state_backend!r}")
+        if state_backend == "sqlite" and not data.get("PERSISTENCE_FILE", cls.persistence_file):
+            raise ValueError("STATE_BACKEND 'sqlite' needs PERSISTENCE_FILE for the shared library snapshot")
+        config = cls(
+            bot_token=data["BOT_TOKEN"],
+            video_folders=tuple(_list_of(data, "VIDEO_FOLDER", str, None)),
+            notepad_file=data["NOTEPAD_FILE"],
+            prebook_file=data.get("PREBOOK_FILE", cls.prebook_file),
+            time_limit=data["TIME_LIMIT"],
+            scene_path=data.get("SCENE_PATH", cls.scene_path),
+            obs_port=data.get("OBS_PORT", cls.obs_port),
+            obs_password=data.get("OBS_PASSWORD", cls.obs_password),
+            endtime_file=data.get("ENDTIME_FILE", cls.endtime_file),
+            movie_path=data.get("MOVIE_PATH", cls.movie_path),
+            log_file=data.get("LOG_FILE", cls.log_file),
+            popularity_file=data.get("POPULARITY_FILE", cls.popularity_file),
+            trending_half_life_hours=data.get("TRENDING_HALF_LIFE_HOURS", cls.trending_half_life_hours),
+            metrics_port=data.get("METRICS_PORT", cls.metrics_port),
+            admin_ids=frozenset(_list_of(data, "ADMIN_IDS", int)),
+            features=features,
+            files_per_page=data.get("FILES_PER_PAGE", cls.files_per_page),
+            library_refresh_seconds=data.get("LIBRARY_REFRESH_SECONDS", cls.library_refresh_seconds),
+            startup_budget_ms=data.get("STARTUP_BUDGET_MS", cls.startup_budget_ms),
+            persistence_file=data.get("PERSISTENCE_FILE", cls.persistence_file),
+            persistence_interval=data.get("PERSISTENCE_INTERVAL", cls.persistence_interval),
+            inline_cache_seconds=data.get("INLINE_CACHE_SECONDS", cls.inline_cache_seconds),
+            scan_workers=data.get("SCAN_WORKERS", cls.scan_workers),
+            scan_retry_seconds=data.get("SCAN_RETRY_SECONDS", cls.scan_retry_seconds),
+            probe_durations=data.get("PROBE_DURATIONS", cls.probe_durations),
+            prefetch_items=data.get("PREFETCH_ITEMS", cls.prefetch_items),
+            prefetch_mb=data.get("PREFETCH_MB", cls.prefetch_mb),
+            prefetch_mbps=data.get("PREFETCH_MBPS", cls.prefetch_mbps),
+            schedule_notify_seconds=data.get("SCHEDULE_NOTIFY_SECONDS", cls.schedule_notify_seconds),
+            autofill=autofill,
+            autofill_minutes=data.get("AUTOFILL_MINUTES", cls.autofill_minutes),
+            autofill_history=data.get("AUTOFILL_HISTORY", cls.autofill_history),
+            autofill_input=data.get("AUTOFILL_INPUT", cls.autofill_input),
+            config_reload_seconds=data.get("CONFIG_RELOAD_SECONDS", cls.config_reload_seconds),
+            media_workers=data.get("MEDIA_WORKERS", cls.media_workers),
+            prebook_limit=data.get("PREBOOK_LIMIT", cls.prebook_limit),
+            prebook_per_user=data.get("PREBOOK_PER_USER", cls.prebook_per_user),
+            state_backend=state_backend,
+            state_file=data.get("STATE_FILE", cls.state_file),
+            webhook_url=data.get("WEBHOOK_URL", cls.webhook_url),
+            webhook_listen=data.get("WEBHOOK_LISTEN", cls.webhook_listen),
+            webhook_port=data.get("WEBHOOK_PORT", cls.webhook_port),
+        )
+        config.check()
+        return config
+
+    def check(self):
+        # Types and ranges of the scalar settings, so a bad edit of a running
+        # bot's config.json is rejected before anything is swapped in.
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if f.type not in (str, int, float, bool) or (value is None and f.name in NULLABLE):
+                continue
+            kinds = (int, float) if f.type is float else f.type
+            if not isinstance(value, kinds) or (isinstance(value, bool) and f.type is not bool):
+                raise TypeError(f"{f.name.upper()} must be {f.type.__name__}, not {value!r}")
+            if f.type in (int, float) and value < 0:
+                raise ValueError(f"{f.name.upper()} must not be negative, not {value!r}")
+        for name in AT_LEAST_ONE:
+            if getattr(self, name) < 1:
+                raise ValueError(f"{name.upper()} must be at least 1")
+        for name in ABOVE_ZERO:
+            if getattr(self, name) <= 0:
+                raise ValueError(f"{name.upper()} must be above 0")
+        for name in PORTS:
+            if (getattr(self, name) or 0) > 65535:
+                raise ValueError(f"{name.upper()} is not a port: {getattr(self, name)}")
+        if not self.video_folders:
+            raise ValueError("VIDEO_FOLDER must list at least one folder")
+
+    def has(self, feature):
+        return feature in self.features
+
+
+def load_config(path="config.json", default_features=ALL_FEATURES):
+    with open(path, "r") as f:
+        return Config.from_dict(json.load(f), default_features)
@@ -0,0 +1,124 @@
+import shutil
+import logging
+import sqlite3
+import threading
+
+from obsbot.metrics import count
+from obsbot.obs import get_video_duration
+
+# Persistent cache of video durations keyed by (path, size, mtime), so a file
+# is probed once and again only when it changes. Missing durations are filled
+# by one background thread running ffprobe a file at a time, newest request
+# first; readers only ever look at the in-memory dict. Followers of a shared
+# setup never probe: they pick up the rows the leader writes.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS durations (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, seconds REAL NOT NULL);
+"""
+
+
+class DurationCache:
+    def __init__(self, path, background=True):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._cache = None
+        self._rowid = 0         # newest row read; INSERT OR REPLACE gives a rewritten row a new rowid
+        self.listeners = []     # called as listener(file, seconds) from the probe thread
+        self.version = 0        # bumped on every change
+        self.available = shutil.which("ffprobe") is not None
+        self.background = background and self.available
+        if not self.available:
+            logging.warning("ffprobe not found; video durations will stay unknown")
+        self._wanted = []
+        self._wake = threading.Event()
+        self._worker = None
+
+    def _entries(self):
+        # Loaded on first use so startup does not read the whole table.
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    rows = self._db.execute("SELECT rowid, path, size, mtime, seconds FROM durations").fetchall()
+                    self._cache = {path: (size, mtime, seconds) for _, path, size, mtime, seconds in rows}
+                    self._rowid = max((row[0] for row in rows), default=0)
+        return self._cache
+
+    def get(self, file):
+        cached = self._entries().get(file["path"])
+        if cached and cached[0] == file.get("size") and cached[1] == file["mtime"]:
+            return cached[2]
+        return None
+
+    def put(self, file, seconds):
+        # 0 is stored too: a file ffprobe cannot read is not retried until it changes.
+        self.put_many([(file, seconds)])
+
+    def put_many(self, pairs):
+        entries = self._entries()
+        rows = [(file["path"], file.get("size"), file["mtime"], seconds) for file, seconds in pairs]
+        for path, size, mtime, seconds in rows:
+            entries[path] = (size, mtime, seconds)
+        self.version += 1
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO durations VALUES (?, ?, ?, ?)", rows)
+        for file, seconds in pairs:
+            for listener in self.listeners:
+                listener(file, seconds)
+
+    def lookup(self, file):
+        # Blocking on a miss; call from worker threads only.
+        seconds = self.get(file)
+        if seconds is None:
+            if not self.available:
+                return 0
+            seconds = get_video_duration(file["path"])
+            self.put(file, seconds)
+        return seconds
+
+    def pick_up(self, files):
+        # Library follow hook: read the durations the leader stored since the
+        # last check instead of probing the same files again.
+        entries = self._entries()
+        with self._lock:
+            rows = self._db.execute("SELECT rowid, path, size, mtime, seconds FROM durations WHERE rowid > ?",
+                                    (self._rowid,)).fetchall()
+        if not rows:
+            return
+        by_path = {f["path"]: f for f in files}
+        for rowid, path, size, mtime, seconds in rows:
+            entries[path] = (size, mtime, seconds)
+            self._rowid = max(self._rowid, rowid)
+        self.version += 1
+        for _, path, size, mtime, seconds in rows:
+            file = by_path.get(path)
+            if file is not None and file.get("size") == size and file["mtime"] == mtime:
+                for listener in self.listeners:
+                    listener(file, seconds)
+
+    # === BACKGROUND PROBE ===
+    def request(self, files):
+        # Library listener. Replaces whatever the probe thread was working through.
+        if not self.background:
+            return
+        missing = [f for f in files if self.get(f) is None]
+        if not missing:
+            return
+        self._wanted = missing
+        self._wake.set()
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, daemon=True, name="duration-probe")
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            wanted, self._wanted = self._wanted, []
+            for file in wanted:
+                if self._wake.is_set():
+                    break
+                if self.get(file) is None:
+                    self.put(file, get_video_duration(file["path"]))
+                    count("durations_probed_total", "video durations learned in the background")
@@ -0,0 +1,600 @@
+import os
+import json
+import time
+import logging
+from datetime import datetime
+from functools import wraps
+
+from telegram import (Update, InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle,
+                      InputTextMessageContent)
+from telegram.ext import ContextTypes
+
+from obsbot.metrics import REGISTRY, timed, count
+from obsbot.obs import FILLER_SCENE
+from obsbot.library import search_view
+from obsbot.tree import dir_view, subtree_view
+from obsbot.state import SESSION_KEYS
+from obsbot.media import filter_view, toggle_filter, parse_query
+
+NOT_CONNECTED_TEXT = "⚠️ TV CHANNEL BOTకు కనెక్ట్ కాలేదు. దయచేసి కొద్దిసేపటికి మళ్లీ ప్రయత్నించండి."
+PREBOOK_NOTE = "📌 A movie is on air: picks are pre-booked for the next break."
+# Keyed by the limit that refused the picks (obsbot.state.prebook_share).
+PREBOOK_FULL_TEXT = {
+    "viewer": "🚫 You already have {per_user} picks pre-booked for the next break. Please try again after the movie.",
+    "total": "🚫 Pre-booking for the next break is full. Please try again after the movie.",
+}
+PREBOOK_CUT_TEXT = {
+    "viewer": "⚠️ {skipped} more not booked: {per_user} picks per viewer.",
+    "total": "⚠️ {skipped} more not booked: the next break is full.",
+}
+LIBRARY_LOADING_TEXT = "⏳ The video library is still loading. Please try again in a moment."
+MOVIE_PLAYING_TEXT = "🚫ప్రస్తుతం ఛానెల్‌లో సినిమా ప్లే అవుతోంది. దయచేసి సినిమా పూర్తయిన తర్వాత ప్రయత్నించండి లేదా వేరే ఛానెల్‌ని ఉపయోగించండి."
+INLINE_RESULTS_PER_PAGE = 50
+FOLDERS_PER_PAGE = 40
+SCHEDULE_ITEMS = 15
+MAX_SELECTED = 25
+FILTER_LANGUAGES = 2
+
+
+def get_runtime(context):
+    return context.bot_data["runtime"]
+
+
+def user_label(user):
+    return f"{user.username or user.full_name} ({user.id})"
+
+
+def format_duration(seconds):
+    minutes = int(seconds) // 60
+    return f"{minutes // 60}h {minutes % 60:02d}m"
+
+
+def selection(user_data):
+    # Ids picked in multi-select mode; anything else stored there (an older
+    # session format) counts as nothing picked.
+    selected = user_data.get("selected")
+    return list(selected) if isinstance(selected, list) else []
+
+
+def filter_buttons(media, view):
+    # (label, token, active): resolution steps plus the most common audio
+    # languages, and whatever filter the view already has.
+    kind, _, arg = view.partition(":")
+    active = parse_query(arg.partition("|")[0])[0] if kind == "find" else set()
+    counts = media.facets()
+    langs = sorted((t for t in counts if t.startswith("lang:")), key=lambda t: -counts[t])[:FILTER_LANGUAGES]
+    tokens = [t for t in ("hd:1080", "hd:720") if t in counts] + langs
+    tokens += sorted(active - set(tokens))
+    return [(filter_label(t), t, t in active) for t in tokens]
+
+
+def filter_label(token):
+    kind, _, value = token.partition(":")
+    if kind == "hd":
+        return f"📺 {value}p+"
+    if kind == "lang":
+        return f"🗣 {value.upper()}"
+    return token
+
+
+def folder_summary(node):
+    text = f"{node.count} files"
+    if node.duration:
+        text += f" · {format_duration(node.duration)}"
+    return text
+
+
+# === DECORATORS ===
+def movie_playing(runtime):
+    return FILLER_SCENE not in runtime.scene.current_scene
+
+
+def require_obs_and_filler(func):
+    # With PREBOOK_LIMIT set, browsing stays open during a movie and picks
+    # are pre-booked instead (see book_files).
+    @wraps(func)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        runtime = get_runtime(context)
+        scene = runtime.scene
+        if not scene.connected:
+            await update.message.reply_text(NOT_CONNECTED_TEXT)
+            return
+        if movie_playing(runtime) and not runtime.config.prebook_limit:
+            await update.message.reply_text(MOVIE_PLAYING_TEXT)
+            logging.warning(f"Blocked {func.__name__}: scene is '{scene.current_scene}'")
+            return
+        return await func(update, context)
+    return wrapper
+
+
+def require_library(func):
+    # Outside rate_limit, so a "loading" answer does not cost the user a try.
+    @wraps(func)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        if get_runtime(context).library.loading():
+            await update.message.reply_text(LIBRARY_LOADING_TEXT)
+            return
+        return await func(update, context)
+    return wrapper
+
+
+def rate_limit(func):
+    @wraps(func)
+    async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        runtime = get_runtime(context)
+        remaining = int(await runtime.state.call(runtime.state.check_rate_limit, update.effective_user.id,
+                                                 runtime.config.time_limit))
+        if remaining:
+            await update.message.reply_text(f"⏳ Please wait {remaining//60}m {remaining%60}s.")
+            return
+        return await func(update, context)
+    return wrapper
+
+
+# user_data only ever holds small, persistable state:
+#   view  - "all", "folder:<path>", "search:<keyword>", "dir:<path>" or
+#           "tree:<path>" (see obsbot.library and obsbot.tree)
+#   sort  - az / za / new / old / trend
+#   page  - current page number
+#   multi, selected - multi-select mode and the list of picked file ids (at
+#           most MAX_SELECTED); transient, only a shared backend keeps them
+# The file list itself is rebuilt from the library index on demand.
+
+
+# === SHARED SESSIONS ===
+# With a shared state backend the next update from a user may reach another
+# worker, so user_data is loaded before every update (group -1) and written
+# back after it (group 1) when it changed.
+async def load_session(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user is None:
+        return
+    state = get_runtime(context).state
+    context.session = await state.call(state.get_session, update.effective_user.id)
+    context.user_data.clear()
+    context.user_data.update(context.session)
+
+
+async def save_session(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user is None or not hasattr(context, "session"):
+        return
+    data = {k: context.user_data[k] for k in SESSION_KEYS if k in context.user_data}
+    if data != context.session:
+        state = get_runtime(context).state
+        await state.call(state.put_session, update.effective_user.id, data)
+
+# === START / FOLDERS ===
+@timed("handler_seconds", "Telegram handler latency", handler="start")
+@require_library
+@rate_limit
+@require_obs_and_filler
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    runtime = get_runtime(context)
+    logging.info(f"/start by {user_label(update.effective_user)}")
+    context.user_data.clear()
+    if runtime.config.has("folders"):
+        await send_folder_list(update, context)
+        return
+    context.user_data["view"] = "all"
+    context.user_data["sort"] = "az"
+    await send_file_page(update, context, 0)
+
+
+async def send_folder_list(update_or_query, context):
+    tree = get_runtime(context).tree
+    roots = [tree.root(i) for i in range(len(tree.roots))]
+    keyboard = [[InlineKeyboardButton(f"{node.name} — {folder_summary(node)}", callback_data=f"folder_{i}")]
+                for i, node in enumerate(roots)]
+    markup = InlineKeyboardMarkup(keyboard)
+    title = "📁 Select a folder to view videos"
+    if isinstance(update_or_query, Update):
+        await update_or_query.message.reply_text(title, reply_markup=markup)
+    else:
+        await update_or_query.edit_message_text(title, reply_markup=markup)
+
+
+@timed("keyboard_build_seconds", "inline keyboard construction")
+def build_folder_keyboard(tree, node, page):
+    # One level of the tree: subfolders with their summaries, then buttons
+    # for the videos in this folder or in the whole subtree.
+    children = tree.children(node)
+    total_pages = max(1, (len(children) - 1) // FOLDERS_PER_PAGE + 1)
+    page = max(0, min(page, total_pages - 1))
+    keyboard = [
+        [InlineKeyboardButton(f"📁 {child.name} — {folder_summary(child)}", callback_data=f"dir_{child.id}_0")]
+        for child in children[page * FOLDERS_PER_PAGE:(page + 1) * FOLDERS_PER_PAGE]
+    ]
+    if total_pages > 1:
+        keyboard.append([
+            InlineKeyboardButton("⬅️ Prev", callback_data=f"dir_{node.id}_{max(0, page-1)}"),
+            InlineKeyboardButton("➡️ Next", callback_data=f"dir_{node.id}_{min(total_pages-1, page+1)}")
+        ])
+    files_row = []
+    if node.files:
+        files_row.append(InlineKeyboardButton(f"🎬 Videos here ({len(node.files)})", callback_data=f"dirfiles_{node.id}"))
+    if children:
+        files_row.append(InlineKeyboardButton(f"📚 All videos ({node.count})", callback_data=f"treefiles_{node.id}"))
+    if files_row:
+        keyboard.append(files_row)
+    up = f"dir_{node.parent.id}_0" if node.parent else "back_folders"
+    keyboard.append([InlineKeyboardButton("⬆️ Up", callback_data=up)])
+    title = f"📁 {node.name}\n🎬 {folder_summary(node)}"
+    if node.latest:
+        title += f"\n🆕 Latest: {datetime.fromtimestamp(node.latest):%Y-%m-%d}"
+    if total_pages > 1:
+        title += f"\n(Page {page+1}/{total_pages})"
+    return title, InlineKeyboardMarkup(keyboard)
+
+
+async def send_folder_node(query, context, node, page=0):
+    title, markup = build_folder_keyboard(get_runtime(context).tree, node, page)
+    await query.edit_message_text(title, reply_markup=markup)
+
+
+# === SEARCH ===
+@timed("handler_seconds", handler="search")
+@require_library
+@rate_limit
+@require_obs_and_filler
+async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    runtime = get_runtime(context)
+    if not context.args:
+        usage = "/search keyword hd:1080 lang:tel" if runtime.media else "/search keyword"
+        await update.message.reply_text(f"❌ Usage: `{usage}`", parse_mode='Markdown')
+        return
+    keyword = " ".join(context.args).lower()
+    logging.info(f"/search '{keyword}' by {user_label(update.effective_user)}")
+    view = search_view(keyword)
+    if runtime.media and parse_query(keyword)[0]:
+        view = filter_view(keyword)
+    if not runtime.library.view(view):
+        await update.message.reply_text("🔍 No matches found.")
+        return
+    context.user_data["view"] = view
+    context.user_data["sort"] = "az"
+    await send_file_page(update, context, 0)
+
+
+# === FILE PAGES ===
+async def send_file_page(update_or_query, context, page):
+    runtime = get_runtime(context)
+    view = context.user_data.get("view", "all")
+    sort = context.user_data.get("sort", "az")
+    if sort == "trend":
+        runtime.popularity.refresh(runtime.config.log_file)
+    video_files = runtime.library.view(view, sort, runtime.popularity)
+    # Clamp: the library may have shrunk since this keyboard was sent.
+    total_pages = (len(video_files) - 1) // runtime.config.files_per_page + 1
+    page = max(0, min(page, total_pages - 1))
+    context.user_data["page"] = page
+    kind, _, arg = view.partition(":")
+    search = arg if kind == "search" else None
+    filters = ()
+    if runtime.media:
+        filters = filter_buttons(runtime.media, view)
+        if kind == "find":
+            # Filters narrow a base view; go back and label from that one.
+            search, _, base = arg.partition("|")
+            kind, _, arg = base.partition(":")
+            if kind == "search":
+                search = f"{arg} {search}"
+    back = "back_folders"
+    if kind in ("dir", "tree") and runtime.tree:
+        node = runtime.tree.by_path(arg)
+        if node:
+            back = f"dir_{node.id}_0"
+    selected = set(selection(context.user_data)) if context.user_data.get("multi") else None
+    title, markup = build_file_keyboard(video_files, page, runtime.config.files_per_page, search, back, selected,
+                                        filters)
+    if runtime.config.prebook_limit and movie_playing(runtime):
+        title += f"\n{PREBOOK_NOTE}"
+
+    if isinstance(update_or_query, Update):
+        await update_or_query.message.reply_text(title, reply_markup=markup)
+    else:
+        await update_or_query.edit_message_text(title, reply_markup=markup)
+
+
+@timed("keyboard_build_seconds", "inline keyboard construction")
+def build_file_keyboard(video_files, page, files_per_page, search=None, back="back_folders", selected=None,
+                        filters=()):
+    # selected is None in normal mode, else the set of picked ids;
+    # filters are (label, token, active) from filter_buttons.
+    total_pages = max(1, (len(video_files) - 1) // files_per_page + 1)
+    start_idx, end_idx = page * files_per_page, min((page+1)*files_per_page, len(video_files))
+    if selected is None:
+        keyboard = [
+            [InlineKeyboardButton(
+                f"{video_files[i]['name']} ({os.path.basename(video_files[i]['folder'])})",
+                callback_data=f"file_{video_files[i]['id']}"
+            )]
+            for i in range(start_idx, end_idx)
+        ]
+        keyboard.append([InlineKeyboardButton("☑️ Select several", callback_data="multi_on")])
+    else:
+        keyboard = [
+            [InlineKeyboardButton(
+                f"{'✅' if video_files[i]['id'] in selected else '▫️'} {video_files[i]['name']} "
+                f"({os.path.basename(video_files[i]['folder'])})",
+                callback_data=f"pick_{video_files[i]['id']}"
+            )]
+            for i in range(start_idx, end_idx)
+        ]
+        picked = len(selected)
+        keyboard.append([
+            InlineKeyboardButton(f"➕ Add selected ({picked}/{MAX_SELECTED})", callback_data="add_selected"),
+            InlineKeyboardButton("✖️ Cancel", callback_data="multi_off")
+        ])
+    keyboard.append([
+        InlineKeyboardButton("🔼 A-Z", callback_data="sort_az"),
+        InlineKeyboardButton("🔽 Z-A", callback_data="sort_za"),
+        InlineKeyboardButton("🆕 New", callback_data="sort_new"),
+        InlineKeyboardButton("📁 Old", callback_data="sort_old"),
+        InlineKeyboardButton("🔥 Trending", callback_data="sort_trend")
+    ])
+    if filters:
+        keyboard.append([InlineKeyboardButton(f"{'✅ ' if active else ''}{label}", callback_data=f"facet_{token}")
+                         for label, token, active in filters])
+    if search:
+        keyboard.append([InlineKeyboardButton("❌ Clear Search", callback_data="clear_search")])
+    keyboard.append([
+        InlineKeyboardButton("⬅️ Prev", callback_data=f"page_{max(0, page-1)}"),
+        InlineKeyboardButton("➡️ Next", callback_data=f"page_{min(total_pages-1, page+1)}"),
+        InlineKeyboardButton("🔁 Refresh", callback_data=f"refresh_{page}")
+    ])
+    keyboard.append([InlineKeyboardButton("🔙 Back", callback_data=back)])
+    title = f"🎬 Select video (Page {page+1}/{total_pages})"
+    if search:
+        title += f"\n🔍 Searching: {search}"
+    return title, InlineKeyboardMarkup(keyboard)
+
+
+# === BUTTONS ===
+@timed("handler_seconds", handler="button_callback")
+async def button_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    runtime = get_runtime(context)
+    query = update.callback_query
+    data = query.data
+    if runtime.library.loading():
+        await query.answer(LIBRARY_LOADING_TEXT, show_alert=True)
+        return
+    if data.startswith("pick_"):
+        await toggle_pick(query, context)
+        return
+    await query.answer()
+    user = query.from_user
+
+    if data.startswith("folder_"):
+        node = runtime.tree.root(int(data.split("_")[1]))
+        if node is None or not node.count:
+            await query.edit_message_text("❌ No video files in this folder.")
+            return
+        await send_folder_node(query, context, node)
+
+    elif data.startswith("dir_") or data.startswith("dirfiles_") or data.startswith("treefiles_"):
+        parts = data.split("_")
+        node = runtime.tree.node(int(parts[1]))
+        if node is None:
+            await query.edit_message_text("❌ This folder is no longer available. Use /start again.")
+            return
+        if parts[0] == "dir":
+            await send_folder_node(query, context, node, int(parts[2]))
+            return
+        context.user_data["view"] = dir_view(node.path) if parts[0] == "dirfiles" else subtree_view(node.path)
+        context.user_data["sort"] = "az"
+        await send_file_page(query, context, 0)
+
+    elif data in ("multi_on", "multi_off"):
+        context.user_data["multi"] = data == "multi_on"
+        context.user_data["selected"] = []
+        await send_file_page(query, context, context.user_data.get("page", 0))
+
+    elif data == "add_selected":
+        if movie_playing(runtime) and not runtime.config.prebook_limit:
+            await query.edit_message_text(MOVIE_PLAYING_TEXT)
+            return
+        files = [f for f in map(runtime.library.get, selection(context.user_data)) if f]
+        context.user_data.pop("selected", None)
+        context.user_data.pop("multi", None)
+        if not files:
+            await send_file_page(query, context, context.user_data.get("page", 0))
+            return
+        await query.edit_message_text(await book_files(runtime, files, user))
+
+    elif data.startswith("file_"):
+        if movie_playing(runtime) and not runtime.config.prebook_limit:
+            await query.edit_message_text(MOVIE_PLAYING_TEXT)
+            return
+        file = runtime.library.get(int(data.split("_")[1]))
+        if file is None:
+            await query.edit_message_text("❌ This file is no longer available. Use /start again.")
+            return
+        await query.edit_message_text(await book_files(runtime, [file], user))
+
+    elif data == "back_folders":
+        context.user_data.clear()
+        if runtime.config.has("folders"):
+            await send_folder_list(query, context)
+        else:
+            context.user_data["view"] = "all"
+            await send_file_page(query, context, 0)
+
+    elif data.startswith("sort_"):
+        context.user_data["sort"] = data.split("_")[1]
+        await send_file_page(query, context, context.user_data.get("page", 0))
+
+    elif data.startswith("page_") or data.startswith("refresh_"):
+        await send_file_page(query, context, int(data.split("_")[1]))
+
+    elif data.startswith("facet_"):
+        context.user_data["view"] = toggle_filter(context.user_data.get("view", "all"), data[len("facet_"):])
+        await send_file_page(query, context, 0)
+
+    elif data == "clear_search":
+        context.user_data["view"] = "all"
+        context.user_data["sort"] = "az"
+        await send_file_page(query, context, 0)
+
+
+async def toggle_pick(query, context):
+    # Toggle and re-render the same page; nothing is queued yet. The id comes
+    # from the client, so it must name a file in the library.
+    runtime = get_runtime(context)
+    file_id = query.data[len("pick_"):]
+    if not file_id.isdigit() or runtime.library.get(int(file_id)) is None:
+        await query.answer("❌ This file is no longer available.")
+        return
+    selected = selection(context.user_data)
+    file_id = int(file_id)
+    if file_id in selected:
+        selected.remove(file_id)
+    elif len(selected) >= MAX_SELECTED:
+        await query.answer(f"⚠️ You can pick up to {MAX_SELECTED} files at once. Add these first.", show_alert=True)
+        return
+    else:
+        selected.append(file_id)
+    await query.answer()
+    context.user_data["selected"] = selected
+    await send_file_page(query, context, context.user_data.get("page", 0))
+
+
+# === QUEUE / ADMIN ===
+async def book_files(runtime, files, user):
+    # Filler on air: straight into the queue. Movie on air: into the
+    # pre-booking queue, committed as one batch at the next break. Returns
+    # the reply text.
+    if not movie_playing(runtime):
+        await enqueue_files(runtime, files, user)
+        if len(files) == 1:
+            return f"✅ Added to queue:\n{files[0]['name']}"
+        return f"✅ Added {len(files)} to queue:\n" + "\n".join(f["name"] for f in files)
+    config = runtime.config
+    accepted, full = await runtime.state.call(runtime.state.prebook, user.id, [f["path"] for f in files],
+                                              config.prebook_limit, config.prebook_per_user)
+    skipped = len(files) - accepted
+    if skipped:
+        count("prebook_rejected_total", "picks refused by a full pre-booking queue", amount=skipped)
+    if not accepted:
+        return PREBOOK_FULL_TEXT[full].format(per_user=config.prebook_per_user)
+    count("prebook_accepted_total", "picks pre-booked during a movie", amount=accepted)
+    files = files[:accepted]
+    await note_selection(runtime, files, user)
+    names = "\n".join(f["name"] for f in files)
+    reply = f"📌 Pre-booked for the next break:\n{names}"
+    if skipped:
+        reply += "\n" + PREBOOK_CUT_TEXT[full].format(skipped=skipped, per_user=config.prebook_per_user)
+    return reply
+
+
+async def enqueue_files(runtime, files, user):
+    # One write and one log line for the whole batch; the OBS queue consumer
+    # sees all of them or none.
+    await runtime.state.call(runtime.state.push_queue, [f["path"] for f in files])
+    await note_selection(runtime, files, user)
+
+
+async def note_selection(runtime, files, user):
+    # Read-ahead, schedule attribution and the log line analytics counts.
+    paths = [f["path"] for f in files]
+    if runtime.prefetcher:
+        # Warm them while the current movie plays, so the commit finds them cached.
+        runtime.prefetcher.warm(paths)
+    if runtime.timeline and runtime.obs:
+        # Through the state backend: only the leader's OBS monitor commits.
+        await runtime.state.call(runtime.state.add_pickers, user.id, paths)
+    if len(files) == 1:
+        # The real parent, not the configured root: analytics rebuilds the
+        # path as folder/name, and files may sit in subfolders.
+        folder = os.path.dirname(files[0]["path"])
+        logging.info(f"Selected file '{files[0]['name']}' from folder '{folder}' by {user_label(user)}")
+    else:
+        logging.info(f"Selected {len(files)} files by {user_label(user)}: {json.dumps(paths, ensure_ascii=False)}")
+
+
+@timed("handler_seconds", handler="list")
+async def list_queue(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    state = get_runtime(context).state
+    queued = await state.call(state.queue)
+    booked = await state.call(state.prebooked)
+    logging.info(f"/list command by {user_label(update.effective_user)}")
+    if queued is None and not booked:
+        await update.message.reply_text("📄 Queue file missing.")
+        return
+    text = "\n".join(queued or [])
+    reply = f"📄 Queue:\n```{text}```" if text else "📄 Queue is empty."
+    if booked:
+        reply += "\n📌 Pre-booked for the next break:\n```" + "\n".join(booked) + "```"
+    await update.message.reply_text(reply, parse_mode='Markdown')
+
+
+@timed("handler_seconds", handler="schedule")
+async def schedule(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    runtime = get_runtime(context)
+    timeline = await runtime.shared_timeline.current() if runtime.shared_timeline else runtime.timeline
+    now = time.time()
+    upcoming = timeline.upcoming(now, SCHEDULE_ITEMS)
+    if not upcoming:
+        await update.message.reply_text("📺 Nothing scheduled right now. Pick something with /start while the filler plays.")
+        return
+    lines = [f"{'▶️ Now' if start <= now else datetime.fromtimestamp(start).strftime('%I:%M %p')}  {item.name}"
+             for start, item in upcoming]
+    lines.append(f"🏁 Next slot at {datetime.fromtimestamp(timeline.end_time()).strftime('%I:%M %p')}")
+    mine = timeline.for_user(update.effective_user.id, now)
+    if mine:
+        lines.append("")
+        lines.append("🎯 Your picks:")
+        lines.extend(f"{item.name} — {'playing now' if start <= now else 'in ' + str(max(1, round((start - now) / 60))) + ' min'}"
+                     for start, item in mine)
+    await update.message.reply_text("📅 Schedule:\n" + "\n".join(lines))
+
+
+# === INLINE MODE ===
+@timed("handler_seconds", handler="inline_query")
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    runtime = get_runtime(context)
+    query = update.inline_query
+    offset = int(query.offset) if query.offset.isdigit() else 0
+    if runtime.library.loading():
+        # Nothing to show yet; cache_time=0 so Telegram does not keep the empty answer.
+        await query.answer([], cache_time=0, is_personal=False)
+        return
+    ids = runtime.inline_search.query(query.query)
+    results = []
+    for file_id in ids[offset:offset + INLINE_RESULTS_PER_PAGE]:
+        file = runtime.library.get(file_id)
+        if file is None:
+            continue
+        results.append(InlineQueryResultArticle(
+            id=str(file_id),
+            title=file["name"],
+            description=os.path.basename(file["folder"]),
+            input_message_content=InputTextMessageContent(f"/add {file_id}")
+        ))
+    end = offset + INLINE_RESULTS_PER_PAGE
+    # Not personal: the same prefix gives everyone the same answer, so Telegram can cache it.
+    await query.answer(results, cache_time=runtime.config.inline_cache_seconds, is_personal=False,
+                       next_offset=str(end) if end < len(ids) else "")
+
+
+@timed("handler_seconds", handler="add")
+@require_library
+@require_obs_and_filler
+async def add_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args or not context.args[0].isdigit():
+        await update.message.reply_text("❌ Pick a title with inline search: type @botname and a few letters.")
+        return
+    runtime = get_runtime(context)
+    file = runtime.library.get(int(context.args[0]))
+    if file is None:
+        await update.message.reply_text("❌ This file is no longer available.")
+        return
+    await update.message.reply_text(await book_files(runtime, [file], update.effective_user))
+
+
+async def stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id not in get_runtime(context).config.admin_ids:
+        return
+    text = REGISTRY.summary() or "No samples yet."
+    roots = get_runtime(context).library.scanner.describe()
+    if roots:
+        text += "\n\n" + roots
+    await update.message.reply_text(f"📊 Stats:\n```\n{text}\n```", parse_mode='Markdown')
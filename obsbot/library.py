@@ -0,0 +1,282 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+from obsbot.metrics import observe
+from obsbot.scanner import Scanner
+
+VIEW_CACHE_SIZE = 64
+FIRST_SCAN_PUBLISH_EVERY = 5000
+FOLLOW_CHECK_SECONDS = 5
+
+SORTS = {
+    "az": (lambda x: x["name"], False),
+    "za": (lambda x: x["name"], True),
+    "new": (lambda x: x["mtime"], True),
+    "old": (lambda x: x["mtime"], False),
+}
+
+
+# Views are short strings so they can sit in user_data and be persisted:
+#   "all", "folder:<configured folder>", "search:<keyword>", plus any kind
+#   registered in LibraryIndex.sources (the folder tree adds "dir:" and "tree:",
+#   media metadata adds "find:")
+def folder_view(folder):
+    return f"folder:{folder}"
+
+
+def search_view(keyword):
+    return f"search:{keyword}"
+
+
+class LibraryIndex:
+    # In-memory snapshot of every video in VIDEO_FOLDER. Handlers read the
+    # snapshot; rescans happen in the background once it is older than
+    # refresh_seconds, so a command never waits on the disks after warm-up.
+    # Every file gets a small integer id that survives rescans and restarts,
+    # which is what the file_<id> buttons carry.
+
+    def __init__(self, folders, refresh_seconds=300, scanner=None):
+        self.folders = list(folders)
+        self.refresh_seconds = refresh_seconds
+        self.scanner = scanner or Scanner()
+        self.version = 0
+        self.listeners = []     # called with the entry list after every scan
+        self.followed = []      # called instead on followers, with the entries after every follow check
+        self.installed = []     # called with the entries after every swap, partial and preloaded ones too,
+                                # on the thread that swapped (keeps derived structures off the event loop)
+        self.sources = {}       # extra view kinds: kind -> callable(arg) returning entries
+        self.source_versions = {}   # kind -> callable; its results change when this does
+        self._snapshot = ([], [], {}, {})   # (files, lowercase names, files by folder, files by id)
+        self._path_ids = {}
+        self._next_id = 1
+        self._views = OrderedDict()
+        self._scanned_at = 0.0
+        self._scan_lock = threading.Lock()
+        self._ready = threading.Event()
+        self._refreshing = False
+        self._follow = None         # (published, load) while following another worker
+        self._followed = None
+        self._checked_at = 0.0
+
+    def _install(self, files):
+        by_folder = {folder: [] for folder in self.folders}
+        by_id = {}
+        for f in files:
+            if "id" not in f:
+                f["id"] = self._path_ids.get(f["path"])
+                if f["id"] is None:
+                    f["id"] = self._next_id
+                    self._next_id += 1
+            self._path_ids[f["path"]] = f["id"]
+            by_id[f["id"]] = f
+            by_folder.setdefault(f["folder"], []).append(f)
+        # Swap the whole snapshot at once; readers never see a half-built index.
+        self._snapshot = (files, [f["name"].lower() for f in files], by_folder, by_id)
+        self._views = OrderedDict()
+        self.version += 1
+        for hook in self.installed:
+            hook(files)
+        self._ready.set()
+
+    def load_snapshot(self, files):
+        # Entries saved by a previous run (with their ids). Marks the index ready
+        # but stale, so the next read triggers a background rescan. An empty
+        # snapshot (first start) leaves the index unready, so commands wait
+        # for the first scan and see its partial results instead of nothing.
+        if not files:
+            return
+        with self._scan_lock:
+            if self._ready.is_set():
+                return
+            self._next_id = max((f["id"] for f in files), default=0) + 1
+            self._install(files)
+
+    def scan(self, roots=None):
+        # roots=None walks every folder; otherwise only the given roots are
+        # walked and the other roots keep their current entries.
+        with observe("library_scan_seconds", "full scans of VIDEO_FOLDER"), self._scan_lock:
+            if roots is None:
+                roots, files = self.folders, []
+            else:
+                files = [f for f in self._snapshot[0] if f["folder"] not in roots]
+            # On the very first scan, publish partial results as they stream in
+            # so the bot can answer before the slowest drive is done.
+            publish = not self._ready.is_set()
+            published = 0
+            for batch in self.scanner.scan(roots):
+                files.extend(batch)
+                if publish and len(files) - published >= FIRST_SCAN_PUBLISH_EVERY:
+                    self._install(list(files))
+                    published = len(files)
+            if roots != self.folders:
+                # A config reload may have removed a root while it was walked.
+                current = set(self.folders)
+                files = [f for f in files if f["folder"] in current]
+            self._install(files)
+            if len(roots) == len(self.folders):
+                self._scanned_at = time.monotonic()
+            self._refreshing = False
+        for listener in self.listeners:
+            listener(files)
+        return files
+
+    def set_folders(self, folders):
+        # Config reload: only added roots are walked; entries of removed roots
+        # are dropped without touching the disk.
+        folders = list(folders)
+        added = [f for f in folders if f not in self.folders]
+        removed = [f for f in self.folders if f not in folders]
+        self.folders = folders
+        if removed:
+            with self._scan_lock:
+                files = [f for f in self._snapshot[0] if f["folder"] not in removed]
+                self._install(files)
+            for root in removed:
+                self.scanner.forget(root)
+            for listener in self.followed if self._follow else self.listeners:
+                listener(files)
+        if added and not self._follow:
+            self.warm(roots=added)
+        return added, removed
+
+    # === SHARED STATE ===
+    def follow(self, published, load):
+        # Follower workers never walk the disks: whenever published() reports
+        # a new version they reload the snapshot the leader saved with load().
+        self._follow = (published, load)
+        self._followed = None
+
+    def lead(self):
+        self._follow = None
+
+    def _reload(self):
+        # The scan listeners (probing durations and media headers) stay on
+        # the leader; followers run the followed hooks, which read what the
+        # leader stored, on every check even if no new snapshot was published.
+        try:
+            published, load = self._follow
+            version = published()
+            if version != self._followed or not self._ready.is_set():
+                files = load()
+                with self._scan_lock:
+                    self._next_id = max((f["id"] for f in files), default=0) + 1
+                    self._install(files)
+                self._followed = version
+            files = self._snapshot[0]
+        except Exception as e:
+            logging.warning(f"Could not reload the shared library snapshot: {e}")
+            self._ready.set()
+            return
+        finally:
+            self._refreshing = False
+        for hook in self.followed:
+            hook(files)
+
+    def warm(self, preload=None, roots=None):
+        # preload (e.g. reading the persisted snapshot) runs first on the same
+        # thread so the index can answer before the disks are walked.
+        def run():
+            if preload:
+                try:
+                    self.load_snapshot(preload())
+                except Exception as e:
+                    logging.warning(f"Could not load library snapshot: {e}")
+            try:
+                self.scan(roots)
+            finally:
+                self._refreshing = False
+
+        self._refreshing = True
+        threading.Thread(target=run, daemon=True, name="library-warm").start()
+
+    def _ensure_fresh(self):
+        # Never waits: handlers run on the event loop next to the OBS tasks.
+        # Until the first (partial) snapshot is in, reads see an empty index
+        # and handlers answer "loading" (see loading()).
+        if self._follow:
+            if self._refreshing:
+                return
+            if not self._ready.is_set() or time.monotonic() - self._checked_at > FOLLOW_CHECK_SECONDS:
+                self._checked_at = time.monotonic()
+                self._refreshing = True
+                threading.Thread(target=self._reload, daemon=True, name="library-follow").start()
+            return
+        if not self._ready.is_set():
+            if not self._refreshing:
+                self.warm()
+        elif not self._refreshing:
+            if time.monotonic() - self._scanned_at > self.refresh_seconds:
+                self.warm()
+            else:
+                # Offline drives are retried on their own backoff schedule
+                # instead of being walked again on every command.
+                retry = self.scanner.due_retries()
+                if retry:
+                    self.warm(roots=retry)
+
+    def loading(self):
+        # True until the first snapshot (or a partial one) is installed;
+        # starts loading it in the background without waiting.
+        self._ensure_fresh()
+        return not self._ready.is_set()
+
+    def files(self):
+        self._ensure_fresh()
+        return list(self._snapshot[0])
+
+    def folder_files(self, folder):
+        self._ensure_fresh()
+        return list(self._snapshot[2].get(folder, []))
+
+    def get(self, file_id):
+        return self._snapshot[3].get(file_id)
+
+    def by_path(self, path):
+        file_id = self._path_ids.get(path)
+        return None if file_id is None else self._snapshot[3].get(file_id)
+
+    def search(self, keyword):
+        self._ensure_fresh()
+        keyword = keyword.lower()
+        files, lower = self._snapshot[0], self._snapshot[1]
+        with observe("search_seconds", "keyword filtering over the library"):
+            return [f for f, name in zip(files, lower) if keyword in name]
+
+    def view(self, view, sort="az", popularity=None):
+        # Sorted file list for a view. Cached per library version, so paging
+        # through a view sorts it once instead of on every click.
+        self._ensure_fresh()
+        views = self._views
+        kind, _, arg = view.partition(":")
+        key = (view, sort, popularity.version if sort == "trend" and popularity else 0,
+               self.source_versions[kind]() if kind in self.source_versions else 0)
+        cached = views.get(key)
+        if cached is not None and cached[0] == self.version:
+            views.move_to_end(key)
+            return cached[1]
+        version = self.version
+        if kind == "folder":
+            files = self.folder_files(arg)
+        elif kind == "search":
+            files = self.search(arg)
+        elif kind in self.sources:
+            files = self.sources[kind](arg)
+        else:
+            files = self.files()
+        with observe("sort_seconds", "file list sorting", sort=sort):
+            if sort == "trend" and popularity:
+                order = popularity.order_map()
+                files.sort(key=lambda x: (order.get(x["path"], len(order)), x["name"]))
+            else:
+                key_func, reverse = SORTS.get(sort, SORTS["az"])
+                files.sort(key=key_func, reverse=reverse)
+        views[key] = (version, files)
+        while len(views) > VIEW_CACHE_SIZE:
+            views.popitem(last=False)
+        return files
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
@@ -0,0 +1,523 @@
+import json
+import struct
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from obsbot.metrics import count, observe
+
+# Media metadata read straight from .mp4/.mkv headers: resolution, video and
+# audio codecs, audio languages and duration. No ffprobe: the boxes/elements
+# needed sit in the first megabyte (or the moov box) of the file.
+#
+# Files are parsed by a process pool fed from one background thread; results
+# are cached in SQLite keyed by (path, size, mtime), like durations. Each
+# filter token ("hd:1080", "lang:tel", "codec:hevc", "audio:aac") has a bitmap
+# of file ids (bit n set = file n matches), so a filtered search is an AND of
+# a few integers instead of a pass over the library.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (path TEXT PRIMARY KEY, size INTEGER, mtime REAL, info TEXT NOT NULL);
+"""
+HEAD_BYTES = 1024 * 1024
+MAX_ELEMENT_BYTES = 32 * 1024 * 1024
+FLUSH_EVERY = 500
+FACET_KINDS = ("hd", "lang", "codec", "audio")
+RESOLUTIONS = ((2160, 3200, 2000), (1440, 2400, 1350), (1080, 1800, 1000), (720, 1200, 700), (480, 640, 460))
+RESOLUTION_ALIASES = {"4k": "2160", "uhd": "2160", "2k": "1440", "fhd": "1080", "hd": "720", "sd": "480"}
+
+VIDEO_CODECS = {"avc1": "h264", "avc3": "h264", "hev1": "hevc", "hvc1": "hevc", "av01": "av1", "vp09": "vp9",
+                "mp4v": "mpeg4", "V_MPEG4/ISO/AVC": "h264", "V_MPEGH/ISO/HEVC": "hevc", "V_AV1": "av1",
+                "V_VP9": "vp9", "V_VP8": "vp8", "V_MPEG4/ISO/ASP": "mpeg4", "V_MPEG2": "mpeg2"}
+AUDIO_CODECS = {"mp4a": "aac", "ac-3": "ac3", "ec-3": "eac3", "opus": "opus", "Opus": "opus", "fLaC": "flac",
+                ".mp3": "mp3", "dtsc": "dts", "A_AAC": "aac", "A_AC3": "ac3", "A_EAC3": "eac3", "A_DTS": "dts",
+                "A_OPUS": "opus", "A_FLAC": "flac", "A_MPEG": "mp3", "A_VORBIS": "vorbis", "A_TRUEHD": "truehd"}
+# Two-letter (BCP 47) and ISO 639-2/T codes folded into the 639-2/B codes
+# Matroska uses, so lang:te, lang:tel and an MP4's "tel" all match.
+LANGUAGES = {"te": "tel", "ta": "tam", "hi": "hin", "en": "eng", "ml": "mal", "kn": "kan", "bn": "ben",
+             "mr": "mar", "ur": "urd", "pa": "pan", "gu": "guj", "or": "ori", "ja": "jpn", "ko": "kor",
+             "zh": "chi", "zho": "chi", "fr": "fre", "fra": "fre", "de": "ger", "deu": "ger", "es": "spa",
+             "it": "ita", "ru": "rus", "ar": "ara"}
+
+
+def normalize_lang(code):
+    code = code.lower().split("-")[0]
+    return LANGUAGES.get(code, code)
+
+
+def resolution_class(width, height):
+    for label, min_width, min_height in RESOLUTIONS:
+        if width >= min_width or height >= min_height:
+            return label
+    return 0
+
+
+# === MP4 ===
+def _boxes(data, start, end):
+    pos = start
+    while pos + 8 <= end:
+        size, kind = struct.unpack_from(">I4s", data, pos)
+        header = 8
+        if size == 1:
+            size, header = struct.unpack_from(">Q", data, pos + 8)[0], 16
+        elif size == 0:
+            size = end - pos
+        if size < header or pos + size > end:
+            return
+        yield kind, pos + header, pos + size
+        pos += size
+
+
+def _child(data, start, end, kind):
+    for found, child_start, child_end in _boxes(data, start, end):
+        if found == kind:
+            return child_start, child_end
+    return None
+
+
+def _read_moov(f):
+    # Top-level boxes are walked with seeks: moov is often at the end.
+    pos = 0
+    while True:
+        f.seek(pos)
+        header = f.read(16)
+        if len(header) < 8:
+            return None
+        size, kind = struct.unpack_from(">I4s", header)
+        header_size = 8
+        if size == 1:
+            size, header_size = struct.unpack_from(">Q", header, 8)[0], 16
+        elif size == 0:
+            size = 1 << 62
+        if size < header_size:
+            return None
+        if kind == b"moov":
+            if size > MAX_ELEMENT_BYTES:
+                return None
+            f.seek(pos + header_size)
+            return f.read(size - header_size)
+        pos += size
+
+
+def parse_mp4(f):
+    moov = _read_moov(f)
+    if moov is None:
+        return None
+    info = {"width": 0, "height": 0, "vcodec": "", "acodecs": [], "langs": [], "seconds": 0.0}
+    for kind, start, end in _boxes(moov, 0, len(moov)):
+        if kind == b"mvhd":
+            if moov[start] == 1:
+                timescale, duration = struct.unpack_from(">IQ", moov, start + 20)
+            else:
+                timescale, duration = struct.unpack_from(">II", moov, start + 12)
+            if timescale:
+                info["seconds"] = duration / timescale
+        elif kind == b"trak":
+            _parse_trak(moov, start, end, info)
+    return info
+
+
+def _parse_trak(data, start, end, info):
+    tkhd = _child(data, start, end, b"tkhd")
+    mdia = _child(data, start, end, b"mdia")
+    if not tkhd or not mdia:
+        return
+    hdlr = _child(data, *mdia, b"hdlr")
+    mdhd = _child(data, *mdia, b"mdhd")
+    minf = _child(data, *mdia, b"minf")
+    stbl = minf and _child(data, *minf, b"stbl")
+    stsd = stbl and _child(data, *stbl, b"stsd")
+    if not hdlr or not stsd or stsd[1] - stsd[0] < 16:
+        return
+    handler = data[hdlr[0] + 8:hdlr[0] + 12]
+    fourcc = data[stsd[0] + 12:stsd[0] + 16].decode("latin-1")
+    if handler == b"vide" and not info["vcodec"]:
+        offset = tkhd[0] + (88 if data[tkhd[0]] == 1 else 76)
+        width, height = struct.unpack_from(">II", data, offset)
+        info["width"], info["height"] = width >> 16, height >> 16
+        info["vcodec"] = VIDEO_CODECS.get(fourcc, fourcc.strip().lower())
+    elif handler == b"soun":
+        info["acodecs"].append(AUDIO_CODECS.get(fourcc, fourcc.strip().lower()))
+        if mdhd:
+            packed = struct.unpack_from(">H", data, mdhd[0] + (32 if data[mdhd[0]] == 1 else 20))[0]
+            lang = "".join(chr((packed >> shift & 0x1F) + 0x60) for shift in (10, 5, 0))
+            if lang.isalpha() and lang != "und":
+                info["langs"].append(normalize_lang(lang))
+
+
+# === MATROSKA ===
+EBML_SEGMENT = 0x18538067
+EBML_SEEKHEAD, EBML_SEEK, EBML_SEEKID, EBML_SEEKPOS = 0x114D9B74, 0x4DBB, 0x53AB, 0x53AC
+EBML_INFO, EBML_SCALE, EBML_DURATION = 0x1549A966, 0x2AD7B1, 0x4489
+EBML_TRACKS, EBML_TRACK, EBML_TRACKTYPE, EBML_CODEC = 0x1654AE6B, 0xAE, 0x83, 0x86
+EBML_LANGUAGE, EBML_LANGUAGE_BCP47, EBML_VIDEO, EBML_WIDTH, EBML_HEIGHT = 0x22B59C, 0x22B59D, 0xE0, 0xB0, 0xBA
+EBML_CLUSTER = 0x1F43B675
+
+
+def _vint(data, pos, marker):
+    first = data[pos]
+    length = 9 - first.bit_length()
+    if length > 8:
+        raise ValueError("bad EBML length")
+    value = first if marker else first & (0xFF >> length)
+    for byte in data[pos + 1:pos + length]:
+        value = value << 8 | byte
+    unknown = not marker and value == (1 << 7 * length) - 1
+    return value, pos + length, unknown
+
+
+def _elements(data, start, end):
+    # (id, data start, data end); sizes past the buffer are clamped to it.
+    pos = start
+    while pos < end:
+        element, pos, _ = _vint(data, pos, True)
+        size, pos, unknown = _vint(data, pos, False)
+        stop = end if unknown else min(pos + size, end)
+        yield element, pos, stop
+        pos = stop
+
+
+def _uint(data, start, end):
+    return int.from_bytes(data[start:end], "big")
+
+
+def parse_mkv(f):
+    data = f.read(HEAD_BYTES)
+    segment = None
+    for element, start, end in _elements(data, 0, len(data)):
+        if element == EBML_SEGMENT:
+            segment = start
+            break
+    if segment is None:
+        return None
+    info = {"width": 0, "height": 0, "vcodec": "", "acodecs": [], "langs": [], "seconds": 0.0}
+    found = {}
+    seeks = {}
+    try:
+        for element, start, end in _elements(data, segment, len(data)):
+            if element == EBML_CLUSTER:
+                break
+            if element in (EBML_INFO, EBML_TRACKS):
+                found[element] = (data, start, end)
+            elif element == EBML_SEEKHEAD:
+                for seek, seek_start, seek_end in _elements(data, start, end):
+                    if seek == EBML_SEEK:
+                        fields = {i: (s, e) for i, s, e in _elements(data, seek_start, seek_end)}
+                        if EBML_SEEKID in fields and EBML_SEEKPOS in fields:
+                            seeks[_uint(data, *fields[EBML_SEEKID])] = _uint(data, *fields[EBML_SEEKPOS])
+    except (ValueError, IndexError):
+        pass
+    for element in (EBML_INFO, EBML_TRACKS):
+        # Not in the first megabyte: follow the SeekHead.
+        if element not in found and element in seeks:
+            found[element] = _read_element(f, segment + seeks[element])
+    if found.get(EBML_INFO):
+        _parse_mkv_info(*found[EBML_INFO], info)
+    if found.get(EBML_TRACKS):
+        data, start, end = found[EBML_TRACKS]
+        for element, track_start, track_end in _elements(data, start, end):
+            if element == EBML_TRACK:
+                _parse_mkv_track(data, track_start, track_end, info)
+    return info
+
+
+def _read_element(f, pos):
+    f.seek(pos)
+    header = f.read(16)
+    try:
+        _, offset, _ = _vint(header, 0, True)
+        size, offset, _ = _vint(header, offset, False)
+    except (ValueError, IndexError):
+        return None
+    if size > MAX_ELEMENT_BYTES:
+        return None
+    f.seek(pos + offset)
+    data = f.read(size)
+    return data, 0, len(data)
+
+
+def _parse_mkv_info(data, start, end, info):
+    scale, duration = 1000000, 0.0
+    for element, value_start, value_end in _elements(data, start, end):
+        if element == EBML_SCALE:
+            scale = _uint(data, value_start, value_end)
+        elif element == EBML_DURATION and value_end - value_start in (4, 8):
+            duration = struct.unpack(">f" if value_end - value_start == 4 else ">d", data[value_start:value_end])[0]
+    info["seconds"] = duration * scale / 1e9
+
+
+def _parse_mkv_track(data, start, end, info):
+    kind, codec, lang, bcp47 = 0, "", "eng", ""     # Matroska's default language is English
+    width = height = 0
+    for element, value_start, value_end in _elements(data, start, end):
+        if element == EBML_TRACKTYPE:
+            kind = _uint(data, value_start, value_end)
+        elif element == EBML_CODEC:
+            codec = data[value_start:value_end].decode("ascii", "replace").rstrip("\0")
+        elif element == EBML_LANGUAGE:
+            lang = data[value_start:value_end].decode("ascii", "replace").rstrip("\0")
+        elif element == EBML_LANGUAGE_BCP47:
+            bcp47 = data[value_start:value_end].decode("ascii", "replace").rstrip("\0")
+        elif element == EBML_VIDEO:
+            for sub, sub_start, sub_end in _elements(data, value_start, value_end):
+                if sub == EBML_WIDTH:
+                    width = _uint(data, sub_start, sub_end)
+                elif sub == EBML_HEIGHT:
+                    height = _uint(data, sub_start, sub_end)
+    if kind == 1 and not info["vcodec"]:
+        info["width"], info["height"] = width, height
+        info["vcodec"] = VIDEO_CODECS.get(codec, VIDEO_CODECS.get(codec.split("/")[0], codec.lower()))
+    elif kind == 2:
+        info["acodecs"].append(AUDIO_CODECS.get(codec, AUDIO_CODECS.get(codec.split("/")[0], codec.lower())))
+        lang = bcp47 or lang
+        if lang and lang != "und":
+            info["langs"].append(normalize_lang(lang))
+
+
+def probe_file(path):
+    # Runs in the process pool. {} means "not a file we can read"; it is
+    # cached like a result so the file is not retried until it changes.
+    try:
+        with open(path, "rb") as f:
+            magic = f.read(8)
+            f.seek(0)
+            if magic[:4] == b"\x1a\x45\xdf\xa3":
+                info = parse_mkv(f)
+            elif magic[4:8] in (b"ftyp", b"moov", b"free", b"mdat", b"wide", b"skip"):
+                info = parse_mp4(f)
+            else:
+                info = None
+    except (OSError, ValueError, IndexError, struct.error):
+        info = None
+    return info or {}
+
+
+def facet_tokens(info):
+    tokens = set()
+    label = resolution_class(info.get("width", 0), info.get("height", 0))
+    for threshold, _, _ in RESOLUTIONS:
+        if label and threshold <= label:
+            tokens.add(f"hd:{threshold}")
+    if info.get("vcodec"):
+        tokens.add(f"codec:{info['vcodec']}")
+    tokens.update(f"audio:{codec}" for codec in info.get("acodecs", ()))
+    tokens.update(f"lang:{lang}" for lang in info.get("langs", ()))
+    return tokens
+
+
+def parse_query(query):
+    # "hd:1080 lang:te love" -> ({"hd:1080", "lang:tel"}, "love")
+    filters, words = set(), []
+    for word in query.lower().split():
+        kind, sep, value = word.partition(":")
+        if sep and kind in FACET_KINDS and value:
+            if kind == "hd":
+                value = RESOLUTION_ALIASES.get(value, value.rstrip("p"))
+            elif kind == "lang":
+                value = normalize_lang(value)
+            filters.add(f"{kind}:{value}")
+        else:
+            words.append(word)
+    return filters, " ".join(words)
+
+
+# Views are "find:<query>|<base view>": the filters narrow whatever the user
+# was looking at ("all", a folder, a search...). The query is stored
+# normalized, so the same filters always make the same view.
+def filter_view(query, base="all"):
+    filters, keyword = parse_query(query.replace("|", " "))
+    return f"find:{' '.join(sorted(filters) + ([keyword] if keyword else []))}|{base}"
+
+
+def toggle_filter(view, token):
+    kind, _, arg = view.partition(":")
+    if kind != "find":
+        return filter_view(token, view)
+    query, _, base = arg.partition("|")
+    tokens = query.split()
+    if token in tokens:
+        tokens.remove(token)
+    else:
+        tokens.append(token)
+    return filter_view(" ".join(tokens), base) if tokens else base
+
+
+def ids_of(bits):
+    # Set bits of a bitmap, lowest first; one pass over its bytes.
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield index * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+def _bitmaps(pairs):
+    # (file, info) pairs -> token -> bitmap of their ids, built in bytearrays.
+    pairs = [(file, info) for file, info in pairs if info]
+    size = max((file["id"] for file, _ in pairs), default=0) // 8 + 1
+    maps = {}
+    for file, info in pairs:
+        for token in facet_tokens(info):
+            bitmap = maps.get(token)
+            if bitmap is None:
+                bitmap = maps[token] = bytearray(size)
+            bitmap[file["id"] >> 3] |= 1 << (file["id"] & 7)
+    return {token: int.from_bytes(bitmap, "little") for token, bitmap in maps.items()}
+
+
+class MediaIndex:
+    def __init__(self, path, library, durations=None, workers=2):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._facet_lock = threading.Lock()    # _rebuild (scan thread) vs _flush (probe thread)
+        self._cache = None
+        self._rowid = 0                 # newest row read, for pick_up()
+        self._picked = None             # library version the follower bitmaps were built for
+        self.library = library
+        self.durations = durations
+        self.workers = workers
+        self.version = 0                # bumped whenever the facets change
+        self._facets = {}               # token -> bitmap of file ids
+        self._counts = (None, {})
+        self._wanted = []
+        self._wake = threading.Event()
+        self._worker = None
+
+    def _entries(self):
+        if self._cache is None:
+            with self._lock:
+                if self._cache is None:
+                    rows = self._db.execute("SELECT rowid, path, size, mtime, info FROM media").fetchall()
+                    self._cache = {path: (size, mtime, json.loads(info)) for _, path, size, mtime, info in rows}
+                    self._rowid = max((row[0] for row in rows), default=0)
+        return self._cache
+
+    def get(self, file):
+        cached = self._entries().get(file["path"])
+        if cached and cached[0] == file.get("size") and cached[1] == file["mtime"]:
+            return cached[2]
+        return None
+
+    def put_many(self, pairs):
+        entries = self._entries()
+        rows = [(file["path"], file.get("size"), file["mtime"], info) for file, info in pairs]
+        for path, size, mtime, info in rows:
+            entries[path] = (size, mtime, info)
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?)",
+                                 [(p, s, m, json.dumps(i)) for p, s, m, i in rows])
+        if self.durations:
+            # Header durations spare the ffprobe pass for these files.
+            known = [(file, info["seconds"]) for file, info in pairs
+                     if info.get("seconds") and self.durations.get(file) is None]
+            if known:
+                self.durations.put_many(known)
+
+    # === FACETS ===
+    def sync(self, files):
+        # Library listener: rebuild the bitmaps for the current ids, then
+        # parse whatever is new or changed in the background.
+        self._rebuild(files)
+        missing = [f for f in files if self.get(f) is None]
+        if missing:
+            self._wanted = missing
+            self._wake.set()
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, daemon=True, name="media-probe")
+                self._worker.start()
+
+    def _rebuild(self, files):
+        with observe("media_facet_build_seconds", "facet bitmap rebuilds"), self._facet_lock:
+            self._facets = _bitmaps((file, self.get(file)) for file in files)
+            self.version += 1
+
+    def pick_up(self, files):
+        # Library follow hook, used instead of sync() on followers: the leader
+        # parses the headers, this reads the rows it stored since the last
+        # check and rebuilds the bitmaps when they or the snapshot changed.
+        entries = self._entries()
+        with self._lock:
+            rows = self._db.execute("SELECT rowid, path, size, mtime, info FROM media WHERE rowid > ?",
+                                    (self._rowid,)).fetchall()
+        for rowid, path, size, mtime, info in rows:
+            entries[path] = (size, mtime, json.loads(info))
+            self._rowid = max(self._rowid, rowid)
+        if rows or self._picked != self.library.version:
+            self._picked = self.library.version
+            self._rebuild(files)
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            wanted, self._wanted = self._wanted, []
+            pool = ProcessPoolExecutor(max_workers=self.workers)
+            batch = []
+            try:
+                for file, info in zip(wanted, pool.map(probe_file, [f["path"] for f in wanted], chunksize=16)):
+                    batch.append((file, info))
+                    count("media_probed_total", "files whose headers were parsed")
+                    if len(batch) >= FLUSH_EVERY or self._wake.is_set():
+                        self._flush(batch)
+                        batch = []
+                        if self._wake.is_set():
+                            break
+            except Exception as e:
+                count("media_probe_errors_total", "metadata pool failures")
+                logging.warning(f"Media metadata pass stopped: {e}")
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+            if batch:
+                self._flush(batch)
+
+    def _flush(self, batch):
+        # Only the batch's bits are added: rebuilding over the whole library
+        # every FLUSH_EVERY files would make the first pass quadratic. Changed
+        # files lost their old bits in sync(), so adding is enough. The lock
+        # keeps a rebuild from replacing _facets between the copy and the
+        # assignment, which would either drop the batch or revive stale bits.
+        self.put_many(batch)
+        with observe("media_facet_build_seconds", "facet bitmap rebuilds"), self._facet_lock:
+            current = []
+            for file, info in batch:
+                known = self.library.get(file["id"])
+                if known is not None and known["path"] == file["path"]:
+                    current.append((file, info))
+            facets = dict(self._facets)
+            for token, bits in _bitmaps(current).items():
+                facets[token] = facets.get(token, 0) | bits
+            self._facets = facets
+            self.version += 1
+
+    def facets(self):
+        # token -> number of files, for offering filter buttons.
+        if self._counts[0] != self.version:
+            self._counts = (self.version, {token: bin(bits).count("1") for token, bits in self._facets.items()})
+        return self._counts[1]
+
+    def match(self, filters):
+        # Bitmap of files having every filter token.
+        facets = self._facets
+        bits = None
+        for token in filters:
+            bits = facets.get(token, 0) if bits is None else bits & facets.get(token, 0)
+        return bits or 0
+
+    def find(self, arg):
+        # Library source for "find:" views.
+        query, _, base = arg.partition("|")
+        filters, keyword = parse_query(query)
+        with observe("facet_query_seconds", "filtered searches"):
+            bits = self.match(filters)
+            if base in ("", "all"):
+                files = [f for f in map(self.library.get, ids_of(bits)) if f]
+            else:
+                ids = set(ids_of(bits))
+                files = [f for f in self.library.view(base) if f["id"] in ids]
+            if keyword:
+                files = [f for f in files if keyword in f["name"].lower()]
+        return files
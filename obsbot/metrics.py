@@ -0,0 +1,235 @@
+import time
+import bisect
+import inspect
+import logging
+import threading
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# In-memory counters and histograms exposed in the Prometheus text format.
+# observe() is one perf_counter pair, a bisect and a locked increment, which keeps
+# the cost per instrumented call around a microsecond (see measure_overhead()).
+
+PREFIX = "obsbot_"
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    # Label values may be Windows paths; the text format only allows \\, \" and \n.
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in sorted(labels.items())) + "}"
+
+
+class Counter:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def render(self):
+        return [f"{PREFIX}{self.name}{_label_str(self.labels)} {self.value}"]
+
+
+class Histogram:
+    def __init__(self, name, labels, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.labels = labels
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        return Timer(self)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation.
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def render(self):
+        lines = []
+        cumulative = 0
+        for bound, n in zip(self.buckets, self.counts):
+            cumulative += n
+            labels = dict(self.labels, le=repr(bound))
+            lines.append(f"{PREFIX}{self.name}_bucket{_label_str(labels)} {cumulative}")
+        labels = dict(self.labels, le="+Inf")
+        lines.append(f"{PREFIX}{self.name}_bucket{_label_str(labels)} {self.count}")
+        lines.append(f"{PREFIX}{self.name}_sum{_label_str(self.labels)} {self.sum:.6f}")
+        lines.append(f"{PREFIX}{self.name}_count{_label_str(self.labels)} {self.count}")
+        return lines
+
+
+class Timer:
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.help = {}
+        self._lock = threading.Lock()
+
+    def _get(self, cls, name, help_text, labels):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self.metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self.metrics.setdefault(key, cls(name, labels))
+                if help_text:
+                    self.help.setdefault(name, help_text)
+        return metric
+
+    def counter(self, name, help_text="", **labels):
+        return self._get(Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text="", **labels):
+        return self._get(Histogram, name, help_text, labels)
+
+    def render(self):
+        lines = []
+        seen = set()
+        for (name, _), metric in sorted(self.metrics.items(), key=lambda kv: kv[0]):
+            if name not in seen:
+                seen.add(name)
+                kind = "histogram" if isinstance(metric, Histogram) else "counter"
+                if name in self.help:
+                    lines.append(f"# HELP {PREFIX}{name} {self.help[name]}")
+                lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        # Short human readable version for the /stats command.
+        lines = []
+        for (name, _), metric in sorted(self.metrics.items(), key=lambda kv: kv[0]):
+            label = name + _label_str(metric.labels)
+            if isinstance(metric, Histogram):
+                if not metric.count:
+                    continue
+                avg = metric.sum / metric.count * 1000
+                p95 = metric.quantile(0.95) * 1000
+                lines.append(f"{label}: n={metric.count} avg={avg:.2f}ms p95<={p95:g}ms")
+            else:
+                lines.append(f"{label}: {metric.value}")
+        return "\n".join(lines)
+
+
+REGISTRY = Registry()
+
+
+# === DECORATORS ===
+def timed(name, help_text="", **labels):
+    histogram = REGISTRY.histogram(name, help_text, **labels)
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - start)
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def observe(name, help_text="", **labels):
+    return REGISTRY.histogram(name, help_text, **labels).time()
+
+
+def count(name, help_text="", amount=1, **labels):
+    REGISTRY.counter(name, help_text, **labels).inc(amount)
+
+
+# === HTTP ENDPOINT ===
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host="127.0.0.1"):
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.info(f"Metrics available at http://{host}:{port}/metrics")
+    return server
+
+
+# === OVERHEAD ===
+def measure_overhead(calls=200000):
+    def plain():
+        return None
+
+    instrumented = timed("overhead_probe_seconds")(plain)
+    start = time.perf_counter()
+    for _ in range(calls):
+        plain()
+    base = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(calls):
+        instrumented()
+    total = time.perf_counter() - start
+    REGISTRY.metrics.pop(("overhead_probe_seconds", ()), None)
+    return (total - base) / calls * 1e6
+
+
+if __name__ == '__main__':
+    print(f"timed() overhead: {measure_overhead():.2f} us/call")
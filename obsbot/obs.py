@@ -0,0 +1,306 @@
+import os
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from functools import partial
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+from obsbot.metrics import timed, observe, count
+
+# obsws_python and subprocess are imported on first use so that importing the
+# bot (and answering the first update) does not pay for them.
+
+SELECT_SCENE = "select"
+FILLER_SCENE = "filler"
+PLAYLIST_INPUT = "selectsource"
+POLL_SECONDS = 5
+
+
+@timed("ffprobe_seconds", "ffprobe duration lookups")
+def get_video_duration(path):
+    import subprocess
+    try:
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "v:0", "-show_entries",
+             "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            universal_newlines=True
+        )
+        return float(result.stdout.strip())
+    except Exception as e:
+        count("ffprobe_errors_total", "ffprobe calls that failed")
+        logging.warning(f"Error getting duration: {e}")
+        return 0
+
+
+@dataclass(frozen=True)
+class ObsState:
+    # Replaced as a whole by the monitor task; readers on any thread see either
+    # the old or the new state, never a mix.
+    connected: bool = False
+    scene: str = "unknown"
+
+
+class FileScene:
+    # Scene source for bots running without the OBS feature: another process
+    # (e.g. obspick.py) keeps SCENE_PATH up to date.
+
+    connected = True
+
+    def __init__(self, scene_path):
+        self.scene_path = scene_path
+
+    @property
+    def current_scene(self):
+        try:
+            with open(self.scene_path, "r") as scenefile:
+                return scenefile.read().strip().lower()
+        except FileNotFoundError:
+            return ""
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def reconfigure(self, config):
+        self.scene_path = config.scene_path
+
+
+class ObsMonitor:
+    # Three asyncio tasks on the bot's event loop:
+    #   monitor  - keeps the connection up and polls the program scene
+    #   queue    - on the filler scene, hands NOTEPAD_FILE to the playlist
+    #   eta      - writes the movie name and end time for each commit
+    # With AUTOFILL, the queue task also keeps the filler's own playlist
+    # (AUTOFILL_INPUT) programmed whenever nobody has queued anything.
+    # obsws_python is blocking and not thread-safe, so every OBS request goes
+    # through one single-thread executor.
+
+    def __init__(self, config, eta=True, prefetcher=None, duration_of=None, timeline=None, autofill=None,
+                 backend=None):
+        if backend is None:
+            from obsbot.state import MemoryState
+            backend = MemoryState(config.notepad_file, prebook_file=config.prebook_file)
+        self.config = config
+        self.backend = backend  # queue, pickers and published scene/timeline (obsbot.state)
+        self.eta = eta
+        self.prefetcher = prefetcher
+        self.duration_of = duration_of or get_video_duration
+        self.timeline = timeline
+        self.autofill = autofill
+        self._autofill_until = 0.0
+        self.state = ObsState()
+        self.client = None
+        self._executor = None
+        self._filler = None
+        self._committed = None
+        self._tasks = []
+
+    @property
+    def connected(self):
+        return self.state.connected
+
+    async def _set_state(self, state):
+        # Published through the backend so follower workers see it too. A
+        # busy state database is not an OBS failure, so it is only logged.
+        self.state = state
+        try:
+            await self.backend.call(self.backend.set_scene, state)
+        except Exception as e:
+            logging.warning(f"Could not publish the OBS scene: {e}")
+
+    @property
+    def current_scene(self):
+        return self.state.scene
+
+    async def start(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="obs")
+        self._filler = asyncio.Event()
+        self._committed = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._monitor(), name="obs-monitor"),
+                       asyncio.create_task(self._consume_queue(), name="obs-queue")]
+        if self.eta:
+            self._tasks.append(asyncio.create_task(self._update_eta(), name="obs-eta"))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.client is not None:
+            await self._call("disconnect", self.client.disconnect)
+            self.client = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        await self._set_state(ObsState())
+        logging.info("OBS monitor stopped")
+
+    async def reconfigure(self, config):
+        # Config reload. File paths are read from self.config on every use;
+        # only a new port or password needs a fresh connection.
+        old, self.config = self.config, config
+        if (old.obs_port, old.obs_password) == (config.obs_port, config.obs_password) or not self._tasks:
+            return
+        logging.info(f"OBS port changed to {config.obs_port}, reconnecting")
+        monitor = self._tasks[0]
+        monitor.cancel()
+        await asyncio.gather(monitor, return_exceptions=True)
+        if self.client is not None:
+            client, self.client = self.client, None
+            try:
+                await self._call("disconnect", client.disconnect)
+            except Exception:
+                pass
+        await self._set_state(ObsState(False, self.state.scene))
+        self._tasks[0] = asyncio.create_task(self._monitor(), name="obs-monitor")
+
+    async def _call(self, request, func, *args, **kwargs):
+        with observe("obs_request_seconds", "OBS websocket requests", request=request):
+            return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args, **kwargs))
+
+    def connect(self):
+        import obsws_python as obs
+        return obs.ReqClient(host='localhost', port=self.config.obs_port,
+                             password=self.config.obs_password, timeout=3)
+
+    # === MONITOR ===
+    async def _monitor(self):
+        while True:
+            try:
+                self.client = await self._call("connect", self.connect)
+                await self._set_state(ObsState(True, self.state.scene))
+                logging.info("OBS connected")
+                while True:
+                    await self.poll()
+                    await asyncio.sleep(POLL_SECONDS)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                await self._set_state(ObsState(False, self.state.scene))
+                count("obs_disconnects_total", "OBS connection failures")
+                logging.warning(f"OBS disconnected. Retrying in {POLL_SECONDS} seconds...")
+                await asyncio.sleep(POLL_SECONDS)
+
+    async def poll(self):
+        response = await self._call("get_current_program_scene", self.client.get_current_program_scene)
+        scene = response.scene_name.lower()
+        await self._set_state(ObsState(True, scene))
+        with open(self.config.scene_path, 'w', encoding='utf-8') as f:
+            f.write(scene)
+        if scene == FILLER_SCENE:
+            if self.timeline and self.timeline.items:
+                # Back on filler: whatever was scheduled has finished or was skipped.
+                self.timeline.clear()
+                await self.backend.call(self.backend.set_timeline, self.timeline.export())
+            self._filler.set()
+
+    # === QUEUE CONSUMER ===
+    # take_queue reads and empties the queue in one step; a failed commit puts
+    # its items back in front of anything queued since.
+    async def _consume_queue(self):
+        while True:
+            await self._filler.wait()
+            self._filler.clear()
+            if not self.state.connected or self.state.scene != FILLER_SCENE:
+                continue
+            # Picks pre-booked during the movie go first, in one batch with
+            # anything queued since.
+            prebooked = await self.backend.call(self.backend.take_prebooked)
+            play_list = prebooked + await self.backend.call(self.backend.take_queue)
+            if self.timeline is not None:
+                # Picks may have been made on any worker; attribution moves
+                # into the timeline here, before anything can be forgotten.
+                for user_id, path in await self.backend.call(self.backend.take_pickers):
+                    self.timeline.picked(path, user_id)
+            if prebooked:
+                logging.info(f"Committing {len(prebooked)} pre-booked picks")
+            if not play_list:
+                if self.autofill and time.monotonic() >= self._autofill_until:
+                    await self.program_filler()
+                continue
+            taken = play_list
+            if self.prefetcher:
+                play_list = await asyncio.to_thread(self.prefetcher.check, play_list)
+                if self.timeline is not None:
+                    kept = set(play_list)
+                    for path in taken:
+                        if path not in kept:
+                            self.timeline.forget(path)
+            if not play_list:
+                continue
+            try:
+                await self.commit(play_list)
+            except asyncio.CancelledError:
+                await self.backend.call(self.backend.restore_queue, taken)
+                raise
+            except Exception as e:
+                await self.backend.call(self.backend.restore_queue, taken)
+                logging.warning(f"Playlist commit failed, items kept in the queue: {e}")
+                continue
+            if self.prefetcher:
+                # The first item is already being read by VLC; warm the ones after it.
+                self.prefetcher.warm(play_list[1:1 + self.prefetcher.items])
+            if self.autofill:
+                for path in play_list:
+                    self.autofill.history.add(path)
+            if self.eta:
+                self._committed.put_nowait(play_list)
+
+    async def commit(self, play_list):
+        await self._call("set_current_program_scene", self.client.set_current_program_scene, SELECT_SCENE)
+        await self._set_state(ObsState(True, SELECT_SCENE))
+        inputsettings = {'playlist': [{'hidden': False, 'selected': False, 'value': path} for path in play_list]}
+        await self._call("set_input_settings", self.client.set_input_settings, PLAYLIST_INPUT, inputsettings, overlay=True)
+        count("playlists_committed_total", "playlists handed to OBS")
+
+    async def program_filler(self):
+        # Hands a fresh auto-programmed slot to the filler source without
+        # leaving the filler scene, so viewers can still pick.
+        play_list = await asyncio.to_thread(self.autofill.build_slot)
+        if self.prefetcher:
+            play_list = await asyncio.to_thread(self.prefetcher.check, play_list)
+        if not play_list:
+            self._autofill_until = time.monotonic() + POLL_SECONDS * 12
+            return
+        seconds = await asyncio.to_thread(lambda: sum(self.duration_of(path) for path in play_list))
+        inputsettings = {'playlist': [{'hidden': False, 'selected': False, 'value': path} for path in play_list]}
+        try:
+            await self._call("set_input_settings", self.client.set_input_settings, self.config.autofill_input,
+                             inputsettings, overlay=True)
+        except Exception as e:
+            logging.warning(f"Could not program the filler source: {e}")
+            return
+        self._autofill_until = time.monotonic() + seconds
+        count("autofill_slots_total", "auto-programmed filler slots")
+        if self.prefetcher:
+            self.prefetcher.warm(play_list[1:1 + self.prefetcher.items])
+
+    # === ETA ===
+    async def _update_eta(self):
+        while True:
+            play_list = await self._committed.get()
+            started = datetime.now()
+            with open(self.config.movie_path, 'w') as mf:
+                mf.write(os.path.splitext(os.path.basename(play_list[0]))[0])
+            if self.timeline is not None:
+                self.timeline.begin(started.timestamp(), len(play_list))
+            total = 0.0
+            for path in play_list:
+                seconds = await asyncio.to_thread(self.duration_of, path)
+                total += seconds
+                if self.timeline is not None:
+                    index = self.timeline.append(path, seconds)
+                    if not seconds and not await asyncio.to_thread(os.path.exists, path):
+                        # Gone before it aired: VLC skips it, later items move up.
+                        self.timeline.remove(index)
+            if self.timeline is not None:
+                await self.backend.call(self.backend.set_timeline, self.timeline.export())
+            end_time = started + timedelta(seconds=total)
+            with open(self.config.endtime_file, 'w') as ef:
+                ef.write(f"Next Slot At {end_time.strftime('%I:%M:%S %p')}\n")
@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+
+from telegram.ext import BasePersistence, PersistenceInput
+
+from obsbot.metrics import observe
+
+# SQLite-backed persistence for python-telegram-bot.
+# Only the small per-user browsing state is kept (USER_KEYS), plus rate-limit
+# timestamps and the library snapshot so a restart neither breaks open
+# keyboards nor forces a full rescan before the first answer.
+# PTB hands us changed user_data every update_interval seconds; we collect it
+# and write one transaction from a worker thread, never on a click.
+
+USER_KEYS = ("view", "sort", "page")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS rate_limits (user_id INTEGER PRIMARY KEY, ts REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS library (id INTEGER PRIMARY KEY, path TEXT NOT NULL, name TEXT NOT NULL,
+                                    folder TEXT NOT NULL, mtime REAL NOT NULL, size INTEGER);
+"""
+
+
+class SqlitePersistence(BasePersistence):
+    def __init__(self, path, update_interval=10):
+        super().__init__(store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True,
+                                                     callback_data=False),
+                         update_interval=update_interval)
+        self.path = path
+        self.rate_limits = {}
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        if "size" not in [row[1] for row in self._db.execute("PRAGMA table_info(library)")]:
+            self._db.execute("ALTER TABLE library ADD COLUMN size INTEGER")
+        self._lock = threading.Lock()
+        self._pending = {}          # user_id -> small dict, or None to delete
+        self._flushed_limits = {}
+        self._limit_horizon = 0
+        self._flush_task = None
+
+    # === READS (startup only) ===
+    async def get_user_data(self):
+        with self._lock:
+            rows = self._db.execute("SELECT user_id, data FROM user_data").fetchall()
+        return {user_id: json.loads(data) for user_id, data in rows}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        return {}
+
+    def load_rate_limits(self, horizon):
+        self._limit_horizon = horizon
+        cutoff = time.time() - horizon
+        with self._lock:
+            rows = self._db.execute("SELECT user_id, ts FROM rate_limits WHERE ts > ?", (cutoff,)).fetchall()
+        self.rate_limits = dict(rows)
+        self._flushed_limits = dict(rows)
+        return self.rate_limits
+
+    def set_rate_limit_horizon(self, horizon):
+        self._limit_horizon = horizon
+
+    def load_library(self):
+        with self._lock:
+            rows = self._db.execute("SELECT id, path, name, folder, mtime, size FROM library").fetchall()
+        return [{"id": i, "path": p, "name": n, "folder": f, "dir": os.path.dirname(p), "mtime": m, "size": s}
+                for i, p, n, f, m, s in rows]
+
+    # === WRITES ===
+    async def update_user_data(self, user_id, data):
+        small = {k: data[k] for k in USER_KEYS if k in data}
+        self._pending[user_id] = small
+        self._schedule_flush()
+
+    async def drop_user_data(self, user_id):
+        self._pending[user_id] = None
+        self._schedule_flush()
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def update_conversation(self, name, key, new_state):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    def _schedule_flush(self):
+        # PTB calls update_user_data for every changed user in one gather();
+        # a single task picks all of them up.
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_soon())
+
+    async def _flush_soon(self):
+        await asyncio.sleep(0)
+        await asyncio.to_thread(self._write_pending)
+
+    def _write_pending(self):
+        pending, self._pending = self._pending, {}
+        limits = {k: v for k, v in list(self.rate_limits.items()) if self._flushed_limits.get(k) != v}
+        if not pending and not limits:
+            return
+        with observe("persistence_flush_seconds", "SQLite persistence flushes"), self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO user_data VALUES (?, ?)",
+                                 [(u, json.dumps(d)) for u, d in pending.items() if d is not None])
+            self._db.executemany("DELETE FROM user_data WHERE user_id = ?",
+                                 [(u,) for u, d in pending.items() if d is None])
+            self._db.executemany("INSERT OR REPLACE INTO rate_limits VALUES (?, ?)", list(limits.items()))
+            self._db.execute("DELETE FROM rate_limits WHERE ts < ?", (time.time() - self._limit_horizon,))
+        self._flushed_limits.update(limits)
+
+    def save_library(self, files):
+        # Library listener: runs on the scan thread, after each rescan.
+        with observe("persistence_flush_seconds"), self._lock, self._db:
+            self._db.execute("DELETE FROM library")
+            self._db.executemany("INSERT INTO library VALUES (?, ?, ?, ?, ?, ?)",
+                                 [(f["id"], f["path"], f["name"], f["folder"], f["mtime"], f.get("size"))
+                                  for f in files])
+        logging.info(f"Saved library snapshot ({len(files)} files)")
+
+    async def flush(self):
+        if self._flush_task is not None:
+            await self._flush_task
+        await asyncio.to_thread(self._write_pending)
+        with self._lock:
+            self._db.close()
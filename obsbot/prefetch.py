@@ -0,0 +1,102 @@
+import os
+import time
+import queue
+import logging
+import threading
+
+from obsbot.metrics import observe, count
+
+# Read-ahead for playlist items on slow drives.
+# Files are warmed by reading their opening chunk into the OS page cache from
+# one background thread, so VLC's first reads do not wait for a disk to spin
+# up. Reads go through one reused buffer (memory stays at BUFFER_BYTES) and
+# are throttled to a bandwidth cap so warming never starves the item that is
+# playing. posix_fadvise is not used: the drives are usually Windows drive
+# letters, and a hint could not be throttled anyway.
+
+BUFFER_BYTES = 1024 * 1024
+CHECK_BYTES = 4096
+WARM_SECONDS = 1800         # how long a warmed file is assumed to stay cached
+MAX_PENDING = 100
+
+
+class Prefetcher:
+    def __init__(self, items=3, chunk_mb=64, bandwidth_mbps=40):
+        self.items = items
+        self.chunk_bytes = int(chunk_mb * 1024 * 1024)
+        self.bandwidth = bandwidth_mbps * 1024 * 1024
+        self._warmed = {}       # path -> monotonic time of the last full warm
+        self._pending = set()
+        self._queue = queue.Queue()
+        self._buffer = bytearray(BUFFER_BYTES)
+        self._thread = None
+
+    def is_warm(self, path):
+        warmed = self._warmed.get(path)
+        return warmed is not None and time.monotonic() - warmed < WARM_SECONDS
+
+    def check(self, play_list):
+        # Runs just before a commit: returns the items OBS can actually open.
+        # Warm items only need a stat; the rest are proven by reading a block.
+        playable = []
+        for path in play_list:
+            if self.is_warm(path) and os.path.isfile(path):
+                count("prefetch_hits_total", "playlist items already warm at commit")
+                playable.append(path)
+                continue
+            count("prefetch_misses_total", "playlist items not warm at commit")
+            try:
+                with open(path, "rb") as f:
+                    f.read(CHECK_BYTES)
+            except OSError as e:
+                count("prefetch_dropped_total", "playlist items dropped as missing or unreadable")
+                logging.warning(f"Dropping unplayable playlist item {path}: {e.strerror or e}")
+                continue
+            playable.append(path)
+        return playable
+
+    def warm(self, paths):
+        # Queue files for read-ahead, oldest request first; duplicates and
+        # files warmed recently are skipped.
+        for path in paths:
+            if path in self._pending or self.is_warm(path):
+                continue
+            if len(self._pending) >= MAX_PENDING:
+                count("prefetch_skipped_total", "read-ahead requests over the pending cap")
+                break
+            self._pending.add(path)
+            self._queue.put(path)
+        if self._thread is None and self._pending:
+            self._thread = threading.Thread(target=self._run, daemon=True, name="prefetch")
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            try:
+                self._read_ahead(path)
+            except OSError as e:
+                count("prefetch_errors_total", "read-ahead failures")
+                logging.warning(f"Read-ahead failed for {path}: {e.strerror or e}")
+            finally:
+                self._pending.discard(path)
+
+    def _read_ahead(self, path):
+        view = memoryview(self._buffer)
+        done = 0
+        start = time.monotonic()
+        with observe("prefetch_seconds", "read-ahead time per file"), open(path, "rb", buffering=0) as f:
+            while done < self.chunk_bytes:
+                n = f.readinto(view[:min(BUFFER_BYTES, self.chunk_bytes - done)])
+                if not n:
+                    break
+                done += n
+                # Sleep off whatever is ahead of the bandwidth budget.
+                ahead = done / self.bandwidth - (time.monotonic() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+        count("prefetch_bytes_total", "bytes read ahead", amount=done)
+        self._warmed[path] = time.monotonic()
+        if len(self._warmed) > MAX_PENDING * 10:
+            cutoff = time.monotonic() - WARM_SECONDS
+            self._warmed = {p: t for p, t in self._warmed.items() if t > cutoff}
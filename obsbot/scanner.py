@@ -0,0 +1,154 @@
+import os
+import time
+import queue
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from obsbot.metrics import observe, count
+
+# Recursive library walker. Roots on different physical drives are walked in
+# parallel (one worker per drive, so a single spinning disk is never asked
+# to seek for two walks at once) and entries are streamed back in batches.
+
+VIDEO_EXTENSIONS = ('.mp4', '.mkv')
+BATCH_SIZE = 1000
+MAX_RETRY_SECONDS = 3600
+
+
+def drive_key(path):
+    drive = os.path.splitdrive(os.path.abspath(path))[0]
+    if drive:
+        return drive.upper()
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return path
+
+
+def walk(root):
+    # Yields lists of entries. Errors below the root are skipped; an error on
+    # the root itself propagates so the caller can mark the root offline.
+    batch = []
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            it = os.scandir(current)
+        except OSError:
+            if current == root:
+                raise
+            logging.warning(f"Skipping unreadable folder: {current}")
+            continue
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(VIDEO_EXTENSIONS):
+                        st = entry.stat()
+                        batch.append({"name": entry.name, "path": entry.path, "folder": root,
+                                      "dir": current, "mtime": st.st_mtime, "size": st.st_size})
+                except OSError:
+                    continue
+                if len(batch) >= BATCH_SIZE:
+                    yield batch
+                    batch = []
+    if batch:
+        yield batch
+
+
+class RootStatus:
+    __slots__ = ("root", "available", "files", "seconds", "error", "failures", "next_retry")
+
+    def __init__(self, root):
+        self.root = root
+        self.available = None       # unknown until the first walk
+        self.files = 0
+        self.seconds = 0.0
+        self.error = ""
+        self.failures = 0
+        self.next_retry = 0.0
+
+    def describe(self):
+        if self.available is None:
+            return f"{self.root}: not scanned yet"
+        if self.available:
+            return f"{self.root}: {self.files} files in {self.seconds:.1f}s"
+        return f"{self.root}: OFFLINE ({self.error}), retry in {max(0, self.next_retry - time.monotonic()):.0f}s"
+
+
+class Scanner:
+    def __init__(self, max_workers=4, retry_seconds=60):
+        self.max_workers = max_workers
+        self.retry_seconds = retry_seconds
+        self.status = {}
+
+    def _status(self, root):
+        status = self.status.get(root)
+        if status is None:
+            status = self.status[root] = RootStatus(root)
+        return status
+
+    def scan(self, roots):
+        # Generator of entry batches from all roots, in arrival order.
+        groups = {}
+        for root in roots:
+            groups.setdefault(drive_key(root), []).append(root)
+        results = queue.Queue()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(groups)) or 1,
+                                thread_name_prefix="scan") as pool:
+            for group in groups.values():
+                pool.submit(self._scan_group, group, results)
+            finished = 0
+            while finished < len(groups):
+                batch = results.get()
+                if batch is None:
+                    finished += 1
+                else:
+                    yield batch
+
+    def _scan_group(self, roots, results):
+        try:
+            for root in roots:
+                self._scan_root(root, results)
+        finally:
+            results.put(None)
+
+    def _scan_root(self, root, results):
+        status = self._status(root)
+        start = time.monotonic()
+        files = 0
+        try:
+            with observe("root_scan_seconds", "walk time per VIDEO_FOLDER root", root=root):
+                for batch in walk(root):
+                    files += len(batch)
+                    results.put(batch)
+        except OSError as e:
+            status.failures += 1
+            status.error = e.strerror or type(e).__name__
+            status.next_retry = time.monotonic() + min(self.retry_seconds * 2 ** (status.failures - 1), MAX_RETRY_SECONDS)
+            count("root_offline_total", "scans that found a root unavailable", root=root)
+            if status.available is not False:
+                logging.warning(f"Video folder offline: {root} ({status.error})")
+            status.available = False
+            return
+        if status.available is False:
+            logging.info(f"Video folder back online: {root}")
+        status.available = True
+        status.failures = 0
+        status.error = ""
+        status.files = files
+        status.seconds = time.monotonic() - start
+
+    def forget(self, root):
+        self.status.pop(root, None)
+
+    def due_retries(self):
+        now = time.monotonic()
+        return [s.root for s in self.status.values() if s.available is False and s.next_retry <= now]
+
+    def offline(self):
+        return [s.root for s in self.status.values() if s.available is False]
+
+    def describe(self):
+        return "\n".join(s.describe() for s in self.status.values())
@@ -0,0 +1,210 @@
+import time
+import asyncio
+import logging
+
+from obsbot.metrics import count
+
+# Broadcast timeline of the committed playlist.
+# Item durations sit in a Fenwick tree, so an item's start time (the sum of
+# everything before it) and "which item is on air now" are O(log n), and
+# adding or removing an item is an O(log n) point update. Everything lives
+# on the bot's event loop: the OBS tasks write it, handlers read it. A
+# committed batch is appended item by item as its durations are looked up,
+# and an item whose file vanished before airing is removed again.
+# With a shared state backend only the leader keeps a live Timeline; it
+# publishes each finished batch (export) and followers rebuild a read-only
+# copy from that (from_published).
+
+
+class Fenwick:
+    def __init__(self, capacity=64):
+        self.tree = [0.0] * (capacity + 1)
+
+    @property
+    def capacity(self):
+        return len(self.tree) - 1
+
+    def add(self, index, delta):
+        i = index + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, count):
+        # Sum of the first count values.
+        total = 0.0
+        while count > 0:
+            total += self.tree[count]
+            count -= count & -count
+        return total
+
+    def search(self, offset):
+        # Number of leading values whose sum is <= offset, i.e. the index of
+        # the value that contains offset.
+        pos = 0
+        step = 1 << self.capacity.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(self.tree) and self.tree[nxt] <= offset:
+                pos = nxt
+                offset -= self.tree[nxt]
+            step >>= 1
+        return pos
+
+
+class ScheduleItem:
+    __slots__ = ("path", "seconds", "user_id", "removed", "notified")
+
+    def __init__(self, path, seconds, user_id=None):
+        self.path = path
+        self.seconds = seconds
+        self.user_id = user_id
+        self.removed = False
+        self.notified = False
+
+    @property
+    def name(self):
+        return self.path.replace("\\", "/").rsplit("/", 1)[-1].rsplit(".", 1)[0]
+
+
+class Timeline:
+    def __init__(self):
+        self.items = []
+        self.anchor = 0.0           # wall time at which items[0] starts
+        self._sums = Fenwick()
+        self._by_user = {}          # user id -> item indexes
+        self._pickers = {}          # path -> user ids waiting for it to be committed
+        self.changed = None         # asyncio.Event, created by the notifier on its loop
+
+    def _touch(self):
+        if self.changed is not None:
+            self.changed.set()
+
+    # === UPDATES ===
+    def picked(self, path, user_id):
+        # Remember who queued a file so its slot can be attributed at commit.
+        self._pickers.setdefault(path, []).append(user_id)
+
+    def forget(self, path):
+        # A picked file that will never be committed (dropped before the commit).
+        pickers = self._pickers.get(path)
+        if pickers:
+            pickers.pop(0)
+            if not pickers:
+                del self._pickers[path]
+
+    def begin(self, start, size=0):
+        # A new batch went on air at start; its items follow through append.
+        # Picks not yet committed keep their attribution.
+        self.items = []
+        self.anchor = start
+        self._sums = Fenwick(max(64, size))
+        self._by_user = {}
+        self._touch()
+
+    def append(self, path, seconds, user_id=None):
+        if user_id is None and self._pickers.get(path):
+            user_id = self._pickers[path][0]
+            self.forget(path)
+        if len(self.items) == self._sums.capacity:
+            self._grow()
+        index = len(self.items)
+        self.items.append(ScheduleItem(path, seconds, user_id))
+        self._sums.add(index, seconds)
+        if user_id is not None:
+            self._by_user.setdefault(user_id, []).append(index)
+        self._touch()
+        return index
+
+    def _grow(self):
+        sums = Fenwick(self._sums.capacity * 2)
+        for index, item in enumerate(self.items):
+            if not item.removed:
+                sums.add(index, item.seconds)
+        self._sums = sums
+
+    def remove(self, index):
+        item = self.items[index]
+        if not item.removed:
+            item.removed = True
+            self._sums.add(index, -item.seconds)
+            self._touch()
+
+    def clear(self):
+        if self.items:
+            self.items = []
+            self._sums = Fenwick()
+            self._by_user = {}
+            self._touch()
+
+    # === QUERIES ===
+    def start_of(self, index):
+        return self.anchor + self._sums.prefix(index)
+
+    def playing(self, now=None):
+        # Index of the item on air; len(items) once the batch is over.
+        now = time.time() if now is None else now
+        if now < self.anchor:
+            return 0
+        return min(self._sums.search(now - self.anchor), len(self.items))
+
+    def upcoming(self, now=None, limit=None):
+        # (start, item) for the item on air and everything after it.
+        result = []
+        for index in range(self.playing(now), len(self.items)):
+            if limit is not None and len(result) >= limit:
+                break
+            if not self.items[index].removed:
+                result.append((self.start_of(index), self.items[index]))
+        return result
+
+    def for_user(self, user_id, now=None):
+        current = self.playing(now)
+        return [(self.start_of(i), self.items[i]) for i in self._by_user.get(user_id, [])
+                if i >= current and not self.items[i].removed]
+
+    def end_time(self):
+        return self.anchor + self._sums.prefix(len(self.items))
+
+    # === SHARING ===
+    def export(self):
+        return {"anchor": self.anchor,
+                "items": [[item.path, item.seconds, item.user_id, item.removed] for item in self.items]}
+
+    @classmethod
+    def from_published(cls, value):
+        timeline = cls()
+        if value:
+            timeline.begin(value["anchor"], len(value["items"]))
+            for path, seconds, user_id, removed in value["items"]:
+                index = timeline.append(path, seconds, user_id)
+                if removed:
+                    timeline.remove(index)
+        return timeline
+
+
+async def notify_before_start(timeline, bot, lead_seconds):
+    # Messages each picker lead_seconds before their item goes on air. Sleeps
+    # until the next one is due or the timeline changes.
+    timeline.changed = asyncio.Event()
+    while True:
+        timeline.changed.clear()
+        now = time.time()
+        pending = [(start, item) for start, item in timeline.upcoming(now)
+                   if item.user_id is not None and not item.notified and start > now]
+        due = [(start, item) for start, item in pending if start - lead_seconds <= now]
+        for start, item in due:
+            item.notified = True
+            minutes = max(1, round((start - now) / 60))
+            try:
+                await bot.send_message(item.user_id, f"⏰ Your pick '{item.name}' starts in about {minutes} min.")
+                count("schedule_notifications_total", "start-time reminders sent")
+            except Exception as e:
+                logging.warning(f"Could not notify {item.user_id}: {e}")
+        if due:
+            continue
+        timeout = min(start - lead_seconds for start, _ in pending) - now if pending else None
+        try:
+            await asyncio.wait_for(timeline.changed.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
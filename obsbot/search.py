@@ -0,0 +1,125 @@
+import re
+import time
+import bisect
+import threading
+from array import array
+from collections import OrderedDict
+
+from obsbot.metrics import timed, observe
+
+# Prefix search over the library for inline mode.
+# Every file name is split into lowercase tokens. The sorted token vocabulary
+# acts as a flattened prefix trie: all tokens starting with "pre" form one
+# contiguous slice found with two bisects, and each token points at a sorted
+# array of file ids. A query matches files where every term prefixes a token.
+
+TOKEN_RE = re.compile(r"\w+")
+RESULT_CACHE_SIZE = 256
+RESULT_CACHE_SECONDS = 60
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+class PrefixIndex:
+    def __init__(self, files):
+        postings = {}
+        for f in files:
+            for token in set(tokenize(f["name"])):
+                postings.setdefault(token, []).append(f["id"])
+        self.tokens = sorted(postings)
+        self.postings = [array("I", sorted(postings[t])) for t in self.tokens]
+        self.by_name = array("I", (f["id"] for f in sorted(files, key=lambda f: f["name"].lower())))
+        self.name_rank = array("I", bytes(4 * (max(self.by_name, default=0) + 1)))
+        for position, file_id in enumerate(self.by_name):
+            self.name_rank[file_id] = position
+
+    def _prefix_slice(self, prefix):
+        lo = bisect.bisect_left(self.tokens, prefix)
+        hi = bisect.bisect_left(self.tokens, prefix + "\U0010ffff", lo)
+        return lo, hi
+
+    def match(self, terms):
+        result = None
+        # Rarest term first keeps the intersections small.
+        slices = sorted((self._prefix_slice(t) for t in terms),
+                        key=lambda s: sum(len(self.postings[i]) for i in range(*s)))
+        for lo, hi in slices:
+            ids = set()
+            for i in range(lo, hi):
+                if result is None:
+                    ids.update(self.postings[i])
+                else:
+                    ids.update(x for x in self.postings[i] if x in result)
+            result = ids
+            if not result:
+                break
+        return result or set()
+
+
+class InlineSearch:
+    # Keeps a PrefixIndex in step with the library and a short-lived LRU of
+    # ranked result ids per query, so paging with next_offset is a slice.
+    # rebuild() runs on the thread that installs each library snapshot (see
+    # LibraryIndex.installed); queries keep using the previous index until
+    # the new one is swapped in and never build one themselves.
+
+    def __init__(self, library, popularity=None):
+        self.library = library
+        self.popularity = popularity
+        self._index = PrefixIndex([])
+        self._index_version = -1
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+
+    @timed("prefix_index_build_seconds", "inline search index builds")
+    def rebuild(self, files=None):
+        version = self.library.version
+        index = PrefixIndex(self.library.files() if files is None else files)
+        with self._lock:
+            self._index, self._index_version = index, version
+            self._results = OrderedDict()
+
+    def index(self):
+        with self._lock:
+            return self._index, self._index_version
+
+    def _rank(self, index, ids):
+        # Trending titles first, then by name. Large result sets are ranked by
+        # filtering the pre-sorted name order instead of sorting them.
+        top = []
+        if self.popularity:
+            for path, _ in self.popularity.top():
+                f = self.library.by_path(path)
+                if f and f["id"] in ids:
+                    top.append(f["id"])
+        seen = set(top)
+        if len(ids) * 20 < len(index.by_name):
+            rest = sorted((i for i in ids if i not in seen), key=index.name_rank.__getitem__)
+        else:
+            rest = [i for i in index.by_name if i in ids and i not in seen]
+        return top + rest
+
+    def query(self, text):
+        terms = tokenize(text)
+        index, version = self.index()
+        key = (" ".join(terms), version, self.popularity.version if self.popularity else 0)
+        now = time.monotonic()
+        results = self._results
+        cached = results.get(key)
+        if cached and now - cached[0] < RESULT_CACHE_SECONDS:
+            results.move_to_end(key)
+            return cached[1]
+        with observe("inline_search_seconds", "inline query matching and ranking"):
+            if terms:
+                ranked = self._rank(index, index.match(terms))
+            elif self.popularity:
+                # Empty query: show what is trending.
+                ranked = [f["id"] for f in map(self.library.by_path, (p for p, _ in self.popularity.top())) if f]
+            else:
+                ranked = []
+        results[key] = (now, ranked)
+        while len(results) > RESULT_CACHE_SIZE:
+            results.popitem(last=False)
+        return ranked
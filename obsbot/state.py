@@ -0,0 +1,436 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from obsbot.obs import ObsState, POLL_SECONDS
+from obsbot.schedule import Timeline
+
+# State shared by everything that serves the channel: rate limits, browsing
+# sessions, the play queue, the OBS scene, the schedule and the library version.
+#
+# MemoryState keeps it in this process (plus NOTEPAD_FILE for the queue and
+# PREBOOK_FILE for pre-bookings, so a restart loses neither), as
+# the bot always has. SqliteState keeps it in one SQLite WAL file, so several
+# worker processes behind one webhook endpoint see the same state, and a
+# crashed worker loses nothing. Every mutation there is a single short
+# transaction, so workers never need to coordinate beyond SQLite's lock.
+# A lease decides which worker talks to OBS and scans the disks.
+#
+# Code on the event loop goes through `await state.call(state.method, ...)`:
+# MemoryState runs the method inline, SqliteState on its own state thread,
+# so a locked database holds up that one update and not the loop.
+
+# user_data keys kept by a shared backend; multi-select is included because the
+# next click may land on another worker.
+SESSION_KEYS = ("view", "sort", "page", "multi", "selected")
+
+
+def fair_order(bookings):
+    # (user_id, path) in booking order -> paths round-robin over viewers:
+    # everyone's first pick, then everyone's second, and so on.
+    rounds = []
+    taken = {}
+    for user_id, path in bookings:
+        n = taken.get(user_id, 0)
+        taken[user_id] = n + 1
+        if n == len(rounds):
+            rounds.append([])
+        rounds[n].append(path)
+    return [path for paths in rounds for path in paths]
+
+
+def prebook_share(paths, mine, total, limit, per_user):
+    # How many of paths fit under the viewer's share and the total capacity,
+    # and which of the two cut them short: "viewer", "total" or None.
+    mine_left, total_left = per_user - mine, limit - total
+    accepted = max(0, min(len(paths), mine_left, total_left))
+    if accepted == len(paths):
+        return accepted, None
+    return accepted, "total" if total_left <= mine_left else "viewer"
+
+
+class MemoryState:
+    shared = False
+
+    def __init__(self, notepad_file, rate_limits=None, prebook_file=None):
+        self.notepad_file = notepad_file
+        self.prebook_file = prebook_file
+        self.rate_limits = rate_limits if rate_limits is not None else {}
+        self._scene = ObsState()
+        self._library_version = None
+        self._prebooked = self._load_prebooked()   # (user_id, path) in booking order
+        self._pickers = []
+
+    async def call(self, method, *args):
+        return method(*args)
+
+    # === RATE LIMITS ===
+    def check_rate_limit(self, user_id, limit, now=None):
+        # Returns the seconds left to wait, or 0 after recording this use.
+        now = time.time() if now is None else now
+        last = self.rate_limits.get(user_id, 0)
+        if now - last < limit:
+            return limit - (now - last)
+        self.rate_limits[user_id] = now
+        return 0
+
+    # === SESSIONS (PTB keeps user_data in memory) ===
+    def get_session(self, user_id):
+        return None
+
+    def put_session(self, user_id, data):
+        pass
+
+    # === QUEUE ===
+    # All of these run on the event loop, like the handlers that push, so a
+    # take never interleaves with a push.
+    def push_queue(self, paths):
+        with open(self.notepad_file, "a") as f:
+            f.write("".join(path + "\n" for path in paths))
+
+    def take_queue(self):
+        if not os.path.isfile(self.notepad_file) or os.stat(self.notepad_file).st_size == 0:
+            return []
+        with open(self.notepad_file, 'r+') as file:
+            play_list = [line.strip() for line in file if line.strip()]
+            file.seek(0)
+            file.truncate()
+        return play_list
+
+    def restore_queue(self, paths):
+        # Back in front of anything queued since they were taken.
+        newer = ""
+        if os.path.isfile(self.notepad_file):
+            with open(self.notepad_file, 'r') as file:
+                newer = file.read()
+        with open(self.notepad_file, 'w') as file:
+            file.writelines(path + "\n" for path in paths)
+            file.write(newer)
+
+    def queue(self):
+        if not os.path.exists(self.notepad_file):
+            return None
+        with open(self.notepad_file, "r") as f:
+            return [line.strip() for line in f if line.strip()]
+
+    # === PRE-BOOKING (picks made while a movie is on air) ===
+    # Mirrored in prebook_file as "user_id<TAB>path" lines, in booking order.
+    def _load_prebooked(self):
+        if not self.prebook_file or not os.path.isfile(self.prebook_file):
+            return []
+        with open(self.prebook_file, "r") as f:
+            rows = [line.rstrip("\n").split("\t", 1) for line in f if "\t" in line]
+        return [(int(user_id), path) for user_id, path in rows]
+
+    def prebook(self, user_id, paths, limit, per_user):
+        # Returns how many of paths were accepted and the limit that stopped
+        # the rest (see prebook_share).
+        mine = sum(1 for booked_by, _ in self._prebooked if booked_by == user_id)
+        accepted, full = prebook_share(paths, mine, len(self._prebooked), limit, per_user)
+        self._prebooked.extend((user_id, path) for path in paths[:accepted])
+        if accepted and self.prebook_file:
+            with open(self.prebook_file, "a") as f:
+                f.write("".join(f"{user_id}\t{path}\n" for path in paths[:accepted]))
+        return accepted, full
+
+    def take_prebooked(self):
+        # A failed commit puts these back through restore_queue, i.e. into
+        # NOTEPAD_FILE, so clearing the file here loses nothing.
+        taken, self._prebooked = self._prebooked, []
+        if taken and self.prebook_file:
+            open(self.prebook_file, "w").close()
+        return fair_order(taken)
+
+    def prebooked(self):
+        return fair_order(self._prebooked)
+
+    # === SCHEDULE ===
+    # Who picked what, until the leader's commit attributes it (Timeline.picked).
+    def add_pickers(self, user_id, paths):
+        self._pickers.extend((user_id, path) for path in paths)
+
+    def take_pickers(self):
+        taken, self._pickers = self._pickers, []
+        return taken
+
+    def timeline(self):
+        return None
+
+    def set_timeline(self, value):
+        pass
+
+    # === SCENE / LIBRARY / LEADERSHIP ===
+    def scene(self):
+        return self._scene
+
+    def set_scene(self, state):
+        self._scene = state
+
+    def library_version(self):
+        return self._library_version
+
+    def set_library_version(self, version):
+        self._library_version = version
+
+    def acquire_lease(self, name, owner, ttl):
+        return True
+
+    def release_lease(self, name, owner):
+        pass
+
+    def close(self):
+        pass
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limits (user_id INTEGER PRIMARY KEY, ts REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS sessions (user_id INTEGER PRIMARY KEY, data TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS queue (seq INTEGER PRIMARY KEY, path TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS prebook (seq INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, path TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS pickers (seq INTEGER PRIMARY KEY, user_id INTEGER NOT NULL, path TEXT NOT NULL);
+"""
+SCENE_STALE_SECONDS = POLL_SECONDS * 4   # a leader that stopped publishing counts as disconnected
+BUSY_SECONDS = 1.0      # SQLite busy timeout; well below POLL_SECONDS and the leader lease
+
+
+class SqliteState:
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        # Autocommit mode; writes open their own BEGIN IMMEDIATE so a
+        # read-then-write is atomic across processes.
+        self._db = sqlite3.connect(path, timeout=BUSY_SECONDS, isolation_level=None, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state")
+
+    def submit(self, method, *args):
+        # For callers outside the event loop that must not wait either.
+        return self._executor.submit(method, *args)
+
+    async def call(self, method, *args):
+        return await asyncio.wrap_future(self.submit(method, *args))
+
+    @contextmanager
+    def _write(self):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+
+    def _read(self, sql, args=()):
+        with self._lock:
+            return self._db.execute(sql, args).fetchall()
+
+    # === RATE LIMITS ===
+    def check_rate_limit(self, user_id, limit, now=None):
+        now = time.time() if now is None else now
+        with self._write() as db:
+            row = db.execute("SELECT ts FROM rate_limits WHERE user_id = ?", (user_id,)).fetchone()
+            if row and now - row[0] < limit:
+                return limit - (now - row[0])
+            db.execute("INSERT OR REPLACE INTO rate_limits VALUES (?, ?)", (user_id, now))
+            db.execute("DELETE FROM rate_limits WHERE ts < ?", (now - max(limit, 1) * 10,))
+        return 0
+
+    # === SESSIONS ===
+    def get_session(self, user_id):
+        rows = self._read("SELECT data FROM sessions WHERE user_id = ?", (user_id,))
+        return json.loads(rows[0][0]) if rows else {}
+
+    def put_session(self, user_id, data):
+        with self._write() as db:
+            db.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?)", (user_id, json.dumps(data)))
+
+    # === QUEUE ===
+    def push_queue(self, paths):
+        with self._write() as db:
+            db.executemany("INSERT INTO queue (path) VALUES (?)", [(p,) for p in paths])
+
+    def take_queue(self):
+        with self._write() as db:
+            rows = db.execute("SELECT seq, path FROM queue ORDER BY seq").fetchall()
+            if rows:
+                db.execute("DELETE FROM queue WHERE seq <= ?", (rows[-1][0],))
+        return [path for _, path in rows]
+
+    def restore_queue(self, paths):
+        with self._write() as db:
+            first = db.execute("SELECT MIN(seq) FROM queue").fetchone()[0] or 1
+            db.executemany("INSERT INTO queue VALUES (?, ?)",
+                           [(first - len(paths) + i, p) for i, p in enumerate(paths)])
+
+    def queue(self):
+        return [path for (path,) in self._read("SELECT path FROM queue ORDER BY seq")]
+
+    # === PRE-BOOKING ===
+    def prebook(self, user_id, paths, limit, per_user):
+        with self._write() as db:
+            total, mine = db.execute("SELECT COUNT(*), COALESCE(SUM(user_id = ?), 0) FROM prebook",
+                                     (user_id,)).fetchone()
+            accepted, full = prebook_share(paths, mine, total, limit, per_user)
+            db.executemany("INSERT INTO prebook (user_id, path) VALUES (?, ?)",
+                           [(user_id, path) for path in paths[:accepted]])
+        return accepted, full
+
+    def take_prebooked(self):
+        with self._write() as db:
+            rows = db.execute("SELECT seq, user_id, path FROM prebook ORDER BY seq").fetchall()
+            if rows:
+                db.execute("DELETE FROM prebook WHERE seq <= ?", (rows[-1][0],))
+        return fair_order((user_id, path) for _, user_id, path in rows)
+
+    def prebooked(self):
+        return fair_order(self._read("SELECT user_id, path FROM prebook ORDER BY seq"))
+
+    # === SCHEDULE ===
+    def add_pickers(self, user_id, paths):
+        with self._write() as db:
+            db.executemany("INSERT INTO pickers (user_id, path) VALUES (?, ?)", [(user_id, p) for p in paths])
+
+    def take_pickers(self):
+        with self._write() as db:
+            rows = db.execute("SELECT seq, user_id, path FROM pickers ORDER BY seq").fetchall()
+            if rows:
+                db.execute("DELETE FROM pickers WHERE seq <= ?", (rows[-1][0],))
+        return [(user_id, path) for _, user_id, path in rows]
+
+    def timeline(self):
+        return self._get("timeline")
+
+    def set_timeline(self, value):
+        self._set("timeline", value)
+
+    # === SCENE / LIBRARY ===
+    def _get(self, key):
+        rows = self._read("SELECT value FROM kv WHERE key = ?", (key,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def _set(self, key, value):
+        with self._write() as db:
+            db.execute("INSERT OR REPLACE INTO kv VALUES (?, ?)", (key, json.dumps(value)))
+
+    def scene(self):
+        value = self._get("scene")
+        if not value:
+            return ObsState()
+        return ObsState(value["connected"] and time.time() - value["ts"] < SCENE_STALE_SECONDS, value["scene"])
+
+    def set_scene(self, state):
+        self._set("scene", {"connected": state.connected, "scene": state.scene, "ts": time.time()})
+
+    def library_version(self):
+        return self._get("library_version")
+
+    def set_library_version(self, version):
+        self._set("library_version", version)
+
+    # === LEADERSHIP ===
+    def acquire_lease(self, name, owner, ttl):
+        # Take or renew the lease; True while this owner holds it.
+        now = time.time()
+        with self._write() as db:
+            row = db.execute("SELECT owner, expires FROM leases WHERE name = ?", (name,)).fetchone()
+            if row and row[0] != owner and row[1] > now:
+                return False
+            db.execute("INSERT OR REPLACE INTO leases VALUES (?, ?, ?)", (name, owner, now + ttl))
+        return True
+
+    def release_lease(self, name, owner):
+        with self._write() as db:
+            db.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._db.close()
+
+
+class SharedScene:
+    # What follower workers read instead of talking to OBS: the leader's last
+    # published scene, cached briefly so a burst of clicks costs one query.
+    # Handlers read it synchronously, so an expired value is served while
+    # the state thread fetches the next one.
+
+    CACHE_SECONDS = 1.0
+
+    def __init__(self, state):
+        self.state = state
+        self._cached = ObsState()
+        self._read_at = 0.0
+
+    def _current(self):
+        now = time.monotonic()
+        if now - self._read_at >= self.CACHE_SECONDS:
+            self._read_at = now
+            self.state.submit(self.state.scene).add_done_callback(self._fetched)
+        return self._cached
+
+    def _fetched(self, future):
+        if future.exception() is None:
+            self._cached = future.result()
+        else:
+            logging.warning(f"Could not read the shared scene: {future.exception()}")
+
+    async def refresh(self):
+        # Startup: have a value before the first update arrives.
+        self._read_at = time.monotonic()
+        try:
+            self._cached = await self.state.call(self.state.scene)
+        except sqlite3.Error as e:
+            logging.warning(f"Could not read the shared scene: {e}")
+
+    @property
+    def connected(self):
+        return self._current().connected
+
+    @property
+    def current_scene(self):
+        return self._current().scene
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def reconfigure(self, config):
+        pass
+
+
+class SharedTimeline:
+    # What follower workers serve /schedule from: the timeline the leader
+    # last published, rebuilt only when it changes.
+
+    CACHE_SECONDS = 1.0
+
+    def __init__(self, state):
+        self.state = state
+        self._published = None
+        self._timeline = Timeline()
+        self._read_at = 0.0
+
+    async def current(self):
+        now = time.monotonic()
+        if now - self._read_at >= self.CACHE_SECONDS:
+            self._read_at = now
+            value = await self.state.call(self.state.timeline)
+            if value != self._published:
+                self._published = value
+                self._timeline = Timeline.from_published(value)
+        return self._timeline
@@ -0,0 +1,211 @@
+import os
+import threading
+
+from obsbot.metrics import observe
+
+# Folder hierarchy over the library index for the folder browser.
+# Every node carries summaries of its whole subtree (file count, total
+# duration, newest mtime) that are adjusted along the path to the root as
+# files come and go, so showing a folder costs O(children) and never walks
+# the disk or the subtree. Nodes have small integer ids for callback data.
+# The whole tree is built eagerly, but on the thread that installs each
+# library snapshot (see LibraryIndex.installed), so a level opened from the
+# bot only reads nodes that already exist; _fresh is just a fallback.
+
+
+# File list views served by the tree (see LibraryIndex.sources):
+#   "dir:<path>" files directly in a folder, "tree:<path>" the whole subtree
+def dir_view(path):
+    return f"dir:{path}"
+
+
+def subtree_view(path):
+    return f"tree:{path}"
+
+
+class FolderNode:
+    __slots__ = ("id", "path", "name", "parent", "children", "files", "count", "duration", "latest", "_ordered")
+
+    def __init__(self, node_id, path, parent):
+        self.id = node_id
+        self.path = path
+        self.name = os.path.basename(path.rstrip("\\/")) or path
+        self.parent = parent
+        self.children = {}      # name -> FolderNode
+        self.files = {}         # file id -> entry, only files directly in this folder
+        self.count = 0
+        self.duration = 0.0
+        self.latest = 0.0
+        self._ordered = None
+
+    def ordered_children(self):
+        if self._ordered is None:
+            self._ordered = sorted(self.children.values(), key=lambda n: n.name.lower())
+        return self._ordered
+
+    def ancestors(self):
+        node = self
+        while node is not None:
+            yield node
+            node = node.parent
+
+    def _recompute_latest(self):
+        self.latest = max([c.latest for c in self.children.values()] +
+                          [f["mtime"] for f in self.files.values()], default=0.0)
+
+
+class FolderTree:
+    def __init__(self, library, durations=None):
+        self.library = library
+        self.durations = durations
+        self._lock = threading.Lock()
+        self._nodes = {}
+        self._by_path = {}
+        self._next_id = 1
+        self._entries = {}      # file id -> (entry, node, counted duration)
+        self._synced_version = -1
+        self.roots = [self._new_node(folder, None) for folder in library.folders]
+
+    def _new_node(self, path, parent):
+        node = FolderNode(self._next_id, path, parent)
+        self._next_id += 1
+        self._nodes[node.id] = node
+        self._by_path[path] = node
+        if parent is not None:
+            parent.children[node.name] = node
+            parent._ordered = None
+        return node
+
+    def set_roots(self, folders):
+        # Config reload: keeps the nodes of surviving roots, drops removed ones
+        # with everything under them.
+        with self._lock:
+            keep = set(folders)
+            for root in self.roots:
+                if root.path in keep:
+                    continue
+                for file_id in [i for i, (entry, _, _) in self._entries.items() if entry["folder"] == root.path]:
+                    self._remove(file_id)
+                del self._nodes[root.id]
+                del self._by_path[root.path]
+            roots = []
+            for folder in folders:
+                node = self._by_path.get(folder)
+                roots.append(node if node is not None and node.parent is None else self._new_node(folder, None))
+            self.roots = roots
+
+    def _node_for(self, entry):
+        node = self._by_path.get(entry["dir"])
+        if node is not None:
+            return node
+        node = self._by_path.get(entry["folder"]) or self._new_node(entry["folder"], None)
+        relative = os.path.relpath(entry["dir"], entry["folder"])
+        for part in relative.replace("\\", "/").split("/"):
+            if part in ("", "."):
+                continue
+            child = node.children.get(part)
+            node = child if child is not None else self._new_node(os.path.join(node.path, part), node)
+        return node
+
+    # === UPDATES ===
+    def _add(self, entry):
+        node = self._node_for(entry)
+        seconds = (self.durations.get(entry) if self.durations else None) or 0.0
+        node.files[entry["id"]] = entry
+        self._entries[entry["id"]] = (entry, node, seconds)
+        for n in node.ancestors():
+            n.count += 1
+            n.duration += seconds
+            if entry["mtime"] > n.latest:
+                n.latest = entry["mtime"]
+
+    def _remove(self, file_id):
+        entry, node, seconds = self._entries.pop(file_id)
+        del node.files[file_id]
+        for n in node.ancestors():
+            n.count -= 1
+            n.duration -= seconds
+            if entry["mtime"] >= n.latest:
+                n._recompute_latest()
+        # Drop folders that became empty (configured roots always stay).
+        while node.parent is not None and node.count == 0:
+            parent = node.parent
+            del parent.children[node.name]
+            parent._ordered = None
+            del self._nodes[node.id]
+            del self._by_path[node.path]
+            node = parent
+
+    def sync(self, files=None):
+        # Library listener: applies only the differences to the current tree.
+        version = self.library.version
+        if files is None:
+            files = self.library.files()
+        with observe("folder_tree_sync_seconds", "folder tree updates after a rescan"), self._lock:
+            current = set()
+            for entry in files:
+                file_id = entry["id"]
+                current.add(file_id)
+                known = self._entries.get(file_id)
+                if known is None:
+                    self._add(entry)
+                elif known[0] is not entry:
+                    old = known[0]
+                    if old["mtime"] != entry["mtime"] or old["dir"] != entry["dir"] or old.get("size") != entry.get("size"):
+                        self._remove(file_id)
+                        self._add(entry)
+                    else:
+                        # Same file from a fresh scan: keep the newer dict.
+                        self._entries[file_id] = (entry, known[1], known[2])
+                        known[1].files[file_id] = entry
+            for file_id in self._entries.keys() - current:
+                self._remove(file_id)
+            self._synced_version = version
+
+    def set_duration(self, entry, seconds):
+        # DurationCache listener.
+        with self._lock:
+            known = self._entries.get(entry["id"])
+            if known is None or known[0]["path"] != entry["path"] or known[0]["mtime"] != entry["mtime"]:
+                return
+            delta = seconds - known[2]
+            self._entries[entry["id"]] = (known[0], known[1], seconds)
+            for n in known[1].ancestors():
+                n.duration += delta
+
+    # === READS ===
+    def _fresh(self):
+        if self._synced_version != self.library.version:
+            self.sync()
+
+    def node(self, node_id):
+        self._fresh()
+        return self._nodes.get(node_id)
+
+    def root(self, index):
+        self._fresh()
+        return self.roots[index] if 0 <= index < len(self.roots) else None
+
+    def by_path(self, path):
+        self._fresh()
+        return self._by_path.get(path)
+
+    def children(self, node):
+        with self._lock:
+            return list(node.ordered_children())
+
+    def dir_files(self, path):
+        node = self.by_path(path)
+        with self._lock:
+            return list(node.files.values()) if node else []
+
+    def subtree_files(self, path):
+        node = self.by_path(path)
+        files = []
+        stack = [node] if node else []
+        with self._lock:
+            while stack:
+                n = stack.pop()
+                files.extend(n.files.values())
+                stack.extend(n.children.values())
+        return files